@@ -1,171 +1,340 @@
-import nltk
-from nltk.probability import FreqDist
 from collections import Counter
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
 import re
 from datetime import datetime, timedelta, timezone
 from dateutil import parser as dateparser
-from nltk.collocations import BigramAssocMeasures, BigramCollocationFinder
+import numpy as np
 import pandas as pd # Make sure pandas is imported
 
-# --- NLTK Setup ---
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-    nltk.data.find ( 'tokenizers/punkt_tab' ) # <-- ADDED THIS CHECK
-except LookupError:
-    print("NLTK data not found. Downloading...")
-    nltk.download('punkt', quiet=True)
-    nltk.download('stopwords', quiet=True)
-    nltk.download ( 'punkt_tab' ,  quiet= True ) # <-- ADDED THIS DOWNLOAD 
+# --- 1. KEYWORD SENTIMENT ANALYSIS (EXPANDED) ---
+# --- NEW EXTENSIVE KEYWORD LISTS ---
+positive_kws = [
+    # Emotional
+    'good', 'great', 'excellent', 'positive', 'love', 'awesome', 'best', 'happy', 'like', 'amazing', 'superb',
+    'fantastic', 'recommend', 'perfect', 'thrilled', 'delighted', 'satisfied', 'easy', 'seamless',
+    
+    # Factual (Business/PR)
+    'wins', 'won', 'award', 'recognition', 'honoured', 'named as', 'ranked #1', 'leading', 'top-tier',
+    'successful', 'successfully', 'oversubscribed', 'exceeds expectations', 'confidence',
+    'grows', 'growth', 'rise', 'increase', 'expansion', 'accelerate', 'boost', 'outperforms',
+    'launches', 'unveils', 'introduces', 'new initiative', 'new product', 'new feature',
+    'profit', 'profits', 'profitable', 'strong performance', 'robust', 'stronger',
+    'upgrades', 'stable outlook', 'reaffirms', 'commitment', 'strengthening'
+]
+appreciation_kws = [
+    'thank', 'thanks', 'grateful', 'kudos', 'congratulations', 'congrats', 'props', 'helpful',
+    'appreciate', 'appreciation', 'lauds', 'commends', 'praised', 'legacy', 'honoring',
+    'empower', 'support', 'champions', 'donates', 'donation', 'csr', 'esg', 'community', 'foundation', 'sponsors'
+]
+negative_kws = [
+    # Emotional
+    'bad', 'poor', 'terrible', 'negative', 'hate', 'awful', 'worst', 'sad', 'dislike', 'broken',
+    'disappointed', 'frustrated', 'horrible', 'useless', 'embarrassing',
+    
+    # Factual (Business/PR)
+    'fail', 'failed', 'issue', 'problem', 'avoid', 'scam', 'fraud', 'fraudulent', 'allegation', 'alleges',
+    'downtime', 'glitch', 'glitches', 'crashes', 'down', 'outage', 'unauthorized',
+    'fined', 'sanctioned', 'penalty', 'lawsuit', 'court', 'arrest', 'efcc',
+    'crisis', 'vulnerabilities', 'threats', 'risk', 'stifling', 'rift',
+    'loss', 'losses', 'decline', 'dip', 'drop', 'slump', 'erosion', 'undersubscribed',
+    'complaint', 'complaints', 'fume', 'laments', 'outcry', 'slams'
+]
+anger_kws = [
+    'angry', 'furious', 'rage', 'mad', 'outrage', 'pissed', 'fuming', 'livid', 'worst!',
+    'stealing', 'thieves', 'scammed', 'disgusted'
+]
+mixed_kws = [
+    'but', 'however', 'although', 'yet', 'still', 'despite', 'while', 'though'
+]
+# --- END OF NEW LISTS ---
 
-stop_words = set(nltk.corpus.stopwords.words('english'))
-stop_words.update(['com', 'www', 'http', 'https', 'co', 'uk', 'amp', 'rt', 'via'])
+_SENTIMENT_KEYWORDS = {
+    'anger': anger_kws,
+    'negative': negative_kws,
+    'positive': positive_kws,
+    'appreciation': appreciation_kws,
+    'mixed': mixed_kws,
+}
+
+# --- Theme keyword lists (checked in priority order) ---
+_THEME_KEYWORDS = [
+    ('CSR/ESG', ['csr', 'esg', 'donation', 'community', 'foundation', 'initiative', 'sustainability', 'empower', 'scholarship']),
+    ('Corporate', ['ceo', 'gmd', 'profit', 'results', 'acquisition', 'corporate', 'raise', 'capital', 'bond', 'earnings', 'dividend', 'financials', 'pre-tax', 'pat', 'shareholders']),
+    ('Partnership/Sponsorship', ['partner', 'sponsorship', 'marathon', 'zecathon', 'collaboration', 'champions']),
+    ('Product/Service', ['app', 'loan', 'card', 'customer service', 'downtime', 'glitch', 'e-channel', 'transfer', 'pos', 'digital', 'feature', 'platform']),
+    ('Legal/Risk', ['fraud', 'cbn', 'efcc', 'fine', 'court', 'scam', 'allegation', 'rift', 'lawsuit', 'crisis', 'vulnerability', 'sanction', 'erosion']),
+]
+
+# Sentiment categories and themes share one bitmask per text. Each sentiment
+# keyword maps to the bits of every category it appears in.
+_SENTIMENT_BITS = {category: 1 << i for i, category in enumerate(_SENTIMENT_KEYWORDS)}
+_THEME_BITS = [(theme, 1 << (len(_SENTIMENT_BITS) + i)) for i, (theme, _) in enumerate(_THEME_KEYWORDS)]
+
+# Label sets for the analyzed data; stored as categoricals (one small int code per row)
+SENTIMENT_DTYPE = pd.CategoricalDtype(['positive', 'appreciation', 'neutral', 'mixed', 'negative', 'anger'])
+THEME_DTYPE = pd.CategoricalDtype([theme for theme, _ in _THEME_KEYWORDS] + ['General News'])
+
+def _build_keyword_flags():
+    """Maps every sentiment keyword to its bitmask."""
+    keyword_flags = {}
+    for category, kws in _SENTIMENT_KEYWORDS.items():
+        for kw in kws:
+            keyword_flags[kw] = keyword_flags.get(kw, 0) | _SENTIMENT_BITS[category]
+
+    # The regex only reports the longest keyword at each position, so a keyword
+    # also carries the bits of any shorter keyword that is a whole-word prefix
+    # of it ('worst!' -> 'worst').
+    for kw in sorted(keyword_flags, key=len):
+        for other in keyword_flags:
+            if other != kw and kw.startswith(other) and re.match(r'\b' + re.escape(other) + r'\b', kw):
+                keyword_flags[kw] |= keyword_flags[other]
+    return keyword_flags
+
+_KEYWORD_FLAGS = _build_keyword_flags()
+
+# Single-word keywords are matched by looking up the text's \w+ tokens, which is
+# exactly what \b...\b would match for them; only the remaining phrases
+# ('named as', 'ranked #1', 'worst!') need a regex.
+_WORD_RE = re.compile(r'\w+')
+_WORD_FLAGS = {k: f for k, f in _KEYWORD_FLAGS.items() if _WORD_RE.fullmatch(k)}
+
+# Whole-word phrase matches starting at every word boundary. The lookahead keeps
+# matches zero-width, so overlapping keywords ('new initiative' / 'initiative')
+# are all seen, as they were with one search per list.
+_PHRASE_RE = re.compile(r'\b(?=(' + '|'.join(
+    re.escape(k) for k in sorted(_KEYWORD_FLAGS.keys() - _WORD_FLAGS.keys(), key=len, reverse=True)
+) + r')\b)')
+
+# Theme keywords keep their substring match ('app' also hits "apps", 'profit'
+# hits "profits"): one alternation per theme, searched in priority order.
+_THEME_RES = [
+    (re.compile('|'.join(re.escape(kw) for kw in kws)), bit)
+    for (_, kws), (_, bit) in zip(_THEME_KEYWORDS, _THEME_BITS)
+]
+
+def _theme_bit(text_lower):
+    """Bit of the first theme (in priority order) with a keyword in the text, or 0."""
+    for theme_re, bit in _THEME_RES:
+        if theme_re.search(text_lower):
+            return bit
+    return 0
+
+def _keyword_flags(text_lower, stop_bits=0):
+    """
+    Bitmask of the sentiment categories hit (whole words) in already-lowercased text.
+    If any of stop_bits is set the phrase scan is skipped or cut short, for
+    callers that only need to know the outcome is decided.
+    """
+    flags = 0
+    for word in _WORD_FLAGS.keys() & set(_WORD_RE.findall(text_lower)):
+        flags |= _WORD_FLAGS[word]
+    if flags & stop_bits:
+        return flags
+    for m in _PHRASE_RE.finditer(text_lower):
+        flags |= _KEYWORD_FLAGS[m.group(1)]
+        if flags & stop_bits:
+            break
+    return flags
+
+# Below this many mentions a process pool costs more to start than it saves
+_PARALLEL_MIN_MENTIONS = 20000
+
+def _keyword_flags_chunk(texts_lower):
+    """Keyword bitmasks for a list of texts (module-level so worker processes can pickle it)."""
+    return [_keyword_flags(t) | _theme_bit(t) for t in texts_lower]
+
+def _keyword_flags_all(texts_lower):
+    """
+    Sentiment and theme bitmasks for every text. Large corpora are split across CPU cores;
+    each mention is independent, so the chunks need no coordination.
+    """
+    workers = os.cpu_count() or 1
+    if len(texts_lower) < _PARALLEL_MIN_MENTIONS or workers < 2:
+        return _keyword_flags_chunk(texts_lower)
+
+    chunk_size = -(-len(texts_lower) // workers)
+    chunks = [texts_lower[i:i + chunk_size] for i in range(0, len(texts_lower), chunk_size)]
+    try:
+        # forkserver: forking the threaded Streamlit server could copy a held lock into a worker
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('forkserver')) as ex:
+            return [flags for chunk in ex.map(_keyword_flags_chunk, chunks) for flags in chunk]
+    except Exception as e:
+        print(f"Parallel keyword scan failed, falling back to a single process: {e}")
+        return _keyword_flags_chunk(texts_lower)
+
+def _theme_from_flags(flags):
+    """First theme (in priority order) set in a keyword bitmask."""
+    for theme, bit in _THEME_BITS:
+        if flags & bit:
+            return theme
+    return 'General News'
+
+def _sentiment_from_flags(flags):
+    """Applies the sentiment priority ladder to a keyword bitmask."""
+    has_pos = bool(flags & _SENTIMENT_BITS['positive'])
+    has_neg = bool(flags & _SENTIMENT_BITS['negative'])
+
+    # Prioritize sentiment
+    if flags & _SENTIMENT_BITS['anger']: return 'anger'
+    if (has_pos and has_neg) or (flags & _SENTIMENT_BITS['mixed'] and (has_pos or has_neg)): return 'mixed'
+    if has_neg: return 'negative'
+    if has_pos: return 'positive'
+    if flags & _SENTIMENT_BITS['appreciation']: return 'appreciation'
+    return 'neutral' # Only if no other keywords are found
+
+def detect_theme(text_lower):
+    """Returns the first matching theme for already-lowercased text."""
+    return _theme_from_flags(_theme_bit(text_lower))
 
-# --- 1. KEYWORD SENTIMENT ANALYSIS (EXPANDED) ---
 def analyze_sentiment_keywords(text):
     """
     Analyzes sentiment based on extensive keywords.
     Returns a single sentiment string.
     """
     if not text: return 'neutral'
-    text_lower = str(text).lower()
-
-    # --- NEW EXTENSIVE KEYWORD LISTS ---
-    positive_kws = [
-        # Emotional
-        'good', 'great', 'excellent', 'positive', 'love', 'awesome', 'best', 'happy', 'like', 'amazing', 'superb',
-        'fantastic', 'recommend', 'perfect', 'thrilled', 'delighted', 'satisfied', 'easy', 'seamless',
-        
-        # Factual (Business/PR)
-        'wins', 'won', 'award', 'recognition', 'honoured', 'named as', 'ranked #1', 'leading', 'top-tier',
-        'successful', 'successfully', 'oversubscribed', 'exceeds expectations', 'confidence',
-        'grows', 'growth', 'rise', 'increase', 'expansion', 'accelerate', 'boost', 'outperforms',
-        'launches', 'unveils', 'introduces', 'new initiative', 'new product', 'new feature',
-        'profit', 'profits', 'profitable', 'strong performance', 'robust', 'stronger',
-        'upgrades', 'stable outlook', 'reaffirms', 'commitment', 'strengthening'
-    ]
-    appreciation_kws = [
-        'thank', 'thanks', 'grateful', 'kudos', 'congratulations', 'congrats', 'props', 'helpful',
-        'appreciate', 'appreciation', 'lauds', 'commends', 'praised', 'legacy', 'honoring',
-        'empower', 'support', 'champions', 'donates', 'donation', 'csr', 'esg', 'community', 'foundation', 'sponsors'
-    ]
-    negative_kws = [
-        # Emotional
-        'bad', 'poor', 'terrible', 'negative', 'hate', 'awful', 'worst', 'sad', 'dislike', 'broken',
-        'disappointed', 'frustrated', 'horrible', 'useless', 'embarrassing',
-        
-        # Factual (Business/PR)
-        'fail', 'failed', 'issue', 'problem', 'avoid', 'scam', 'fraud', 'fraudulent', 'allegation', 'alleges',
-        'downtime', 'glitch', 'glitches', 'crashes', 'down', 'outage', 'unauthorized',
-        'fined', 'sanctioned', 'penalty', 'lawsuit', 'court', 'arrest', 'efcc',
-        'crisis', 'vulnerabilities', 'threats', 'risk', 'stifling', 'rift',
-        'loss', 'losses', 'decline', 'dip', 'drop', 'slump', 'erosion', 'undersubscribed',
-        'complaint', 'complaints', 'fume', 'laments', 'outcry', 'slams'
-    ]
-    anger_kws = [
-        'angry', 'furious', 'rage', 'mad', 'outrage', 'pissed', 'fuming', 'livid', 'worst!',
-        'stealing', 'thieves', 'scammed', 'disgusted'
-    ]
-    mixed_kws = [
-        'but', 'however', 'although', 'yet', 'still', 'despite', 'while', 'though'
-    ]
-    # --- END OF NEW LISTS ---
-
-    pos_count = sum(1 for k in positive_kws if re.search(r'\b' + re.escape(k) + r'\b', text_lower))
-    neg_count = sum(1 for k in negative_kws if re.search(r'\b' + re.escape(k) + r'\b', text_lower))
-    anger_count = sum(1 for k in anger_kws if re.search(r'\b' + re.escape(k) + r'\b', text_lower))
-    app_count = sum(1 for k in appreciation_kws if re.search(r'\b' + re.escape(k) + r'\b', text_lower))
-    has_mixed = any(re.search(r'\b' + re.escape(k) + r'\b', text_lower) for k in mixed_kws)
-
-    # Prioritize sentiment
-    if anger_count > 0: return 'anger'
-    if (pos_count > 0 and neg_count > 0) or (has_mixed and (pos_count > 0 or neg_count > 0)): return 'mixed'
-    if neg_count > 0: return 'negative'
-    if pos_count > 0: return 'positive'
-    if app_count > 0: return 'appreciation'
-    return 'neutral' # Only if no other keywords are found
+    # Anger outranks every other category, so stop scanning once it is seen
+    return _sentiment_from_flags(_keyword_flags(str(text).lower(), stop_bits=_SENTIMENT_BITS['anger']))
 
 # --- 2. KEYWORD/PHRASE EXTRACTION ---
-def extract_keywords(all_text, brand, competitors):
+# Alphabetic runs of 3+ letters; replaces word_tokenize + the len/isalpha filter
+_TOKEN_RE = re.compile(r'[^\W\d_]{3,}')
+
+# Generic bank words that would otherwise crowd out the real topics
+_GENERIC_STOP_WORDS = ('bank', 'plc', 'ltd', 'group', 'holdings', 'zenith', 'access', 'gtco', 'first', 'cbn', 'customer', 'customers')
+
+@lru_cache(maxsize=1)
+def get_stop_words():
+    """
+    NLTK English stopwords plus web noise. NLTK is imported (and the corpus
+    downloaded if missing) on first use rather than on every module import;
+    only the small stopwords corpus is needed since tokenizing is regex-based.
+    """
+    import nltk
+    try:
+        nltk.data.find('corpora/stopwords')
+    except LookupError:
+        print("NLTK stopwords not found. Downloading...")
+        nltk.download('stopwords', quiet=True)
+    return frozenset(nltk.corpus.stopwords.words('english')).union(
+        ['com', 'www', 'http', 'https', 'co', 'uk', 'amp', 'rt', 'via']
+    )
+
+@lru_cache(maxsize=32)
+def _stopword_set(brand, competitors, extra_stopwords):
+    """Stopwords plus the brand, competitor, generic bank and extra words, built once per combination."""
+    return get_stop_words().union(
+        [brand.lower()], (c.lower() for c in competitors), _GENERIC_STOP_WORDS, extra_stopwords
+    )
+
+def extract_keywords(all_text, brand, competitors, extra_stopwords=frozenset()):
     """
     Extracts top single keywords and two-word phrases (bigrams).
+    The brand and competitor names are always excluded; extra_stopwords
+    (lowercase) are excluded as well.
     """
-    tokens = nltk.word_tokenize(all_text.lower())
+    tokens = _TOKEN_RE.findall(all_text.lower())
     
-    dynamic_stop_words = stop_words.copy()
-    dynamic_stop_words.add(brand.lower())
-    for c in competitors:
-        dynamic_stop_words.add(c.lower())
-    # Add generic bank words
-    dynamic_stop_words.update(['bank', 'plc', 'ltd', 'group', 'holdings', 'zenith', 'access', 'gtco', 'first', 'cbn', 'customer', 'customers'])
-
-    filtered_tokens = [t for t in tokens if len(t) > 2 and t.isalpha() and t not in dynamic_stop_words]
+    dynamic_stop_words = _stopword_set(brand, tuple(competitors), frozenset(extra_stopwords))
+
+    filtered_tokens = [t for t in tokens if t not in dynamic_stop_words]
     
-    unigram_freq = FreqDist(filtered_tokens)
-    finder = BigramCollocationFinder.from_words(filtered_tokens)
-    finder.apply_freq_filter(2) # Only show phrases that appear >= 2 times
-    bigram_freq = finder.ngram_fd
-
-    combined_freq = Counter()
-    for word, freq in unigram_freq.items():
-        combined_freq[word] += freq
+    unigram_freq = Counter(filtered_tokens)
+    bigram_freq = Counter(zip(filtered_tokens, filtered_tokens[1:]))
+
+    combined_freq = Counter(unigram_freq)
     for phrase_tuple, freq in bigram_freq.items():
-        combined_freq[" ".join(phrase_tuple)] += freq
+        if freq >= 2: # Only show phrases that appear >= 2 times
+            combined_freq[" ".join(phrase_tuple)] += freq
 
     return combined_freq.most_common(10)
 
 # --- 3. MAIN KPI CALCULATION ENGINE ---
+# Sources counted as social for engagement (substring match on the source name)
+SOCIAL_SOURCES = frozenset(['reddit.com', 'fb', 'ig', 'threads', 'twitter', 'x'])
+_SOCIAL_RE = re.compile('|'.join(re.escape(s) for s in sorted(SOCIAL_SOURCES)))
+
+def _numeric_column(df, col, default):
+    """Column coerced to numbers (bad values -> NaN), or a constant if it is missing."""
+    if col not in df.columns:
+        return pd.Series(default, index=df.index, dtype='float64')
+    return pd.to_numeric(df[col], errors='coerce')
+
+def _kpi_reductions(authority, likes, comments, reach, is_favourable, is_social):
+    """
+    Sums the numeric KPIs over contiguous float64 arrays (NaN = missing/unparseable).
+    Returns (mis, total_engagement, num_social_mentions, reach).
+    """
+    mis = float(np.nansum(authority, where=is_favourable))
+    # Social rows with unparseable likes/comments are skipped, like the old try/except
+    engaged = is_social & ~np.isnan(likes) & ~np.isnan(comments)
+    total_engagement = int(np.trunc(likes[engaged]).sum() + np.trunc(comments[engaged]).sum())
+    total_reach = int(np.trunc(np.nan_to_num(reach)).sum())
+    return mis, total_engagement, int(engaged.sum()), total_reach
+
+@lru_cache(maxsize=32)
+def _brand_pattern(brand_names):
+    """
+    Compiled whole-word scan over the (deduplicated) brand names; group 'b<i>'
+    is brand_names[i]. Every brand gets its own zero-width lookahead, so names
+    that overlap ("Zenith Bank" and "Zenith") are each found, as separate
+    per-brand searches would find them.
+    """
+    names = [re.escape(b.lower()) for b in brand_names]
+    return re.compile(r'\b(?=(?:' + '|'.join(names) + r')\b)' + ''.join(
+        f'(?=(?P<b{i}>{name}\\b)?)' for i, name in enumerate(names)
+    ))
+
 def compute_kpis(full_data, campaign_messages, brand, competitors):
     """
     Calculates all KPIs. This function NOW PERFORMS
     sentiment and brand analysis.
+    Accepts a list of mention dicts or a DataFrame; the per-mention work
+    runs column-wise and 'analyzed_data' is returned as a DataFrame.
     """
-    if not full_data: return {}
+    if full_data is None or len(full_data) == 0: return {}
 
-    total_mentions = len(full_data)
+    df = full_data.copy() if isinstance(full_data, pd.DataFrame) else pd.DataFrame(full_data)
+    total_mentions = len(df)
     all_brands_list = [brand] + competitors
-    
-    tones = []
-    themes = []
-    brand_counts = Counter()
-    
-    # --- Main Analysis Loop ---
-    for item in full_data:
-        text = item.get('text', '')
-        text_lower = str(text).lower()
-
-        # 1. Perform Sentiment Analysis (Live)
-        sentiment = analyze_sentiment_keywords(text) # Uses our new, better lists
-        item['sentiment'] = sentiment
-        tones.append(sentiment)
-        
-        # 2. Perform Thematic Analysis (Live) - Also expanded
-        if any(kw in text_lower for kw in ['csr', 'esg', 'donation', 'community', 'foundation', 'initiative', 'sustainability', 'empower', 'scholarship']):
-            item['theme'] = 'CSR/ESG'
-        elif any(kw in text_lower for kw in ['ceo', 'gmd', 'profit', 'results', 'acquisition', 'corporate', 'raise', 'capital', 'bond', 'earnings', 'dividend', 'financials', 'pre-tax', 'pat', 'shareholders']):
-            item['theme'] = 'Corporate'
-        elif any(kw in text_lower for kw in ['partner', 'sponsorship', 'marathon', 'zecathon', 'collaboration', 'champions']):
-            item['theme'] = 'Partnership/Sponsorship'
-        elif any(kw in text_lower for kw in ['app', 'loan', 'card', 'customer service', 'downtime', 'glitch', 'e-channel', 'transfer', 'pos', 'digital', 'feature', 'platform']):
-            item['theme'] = 'Product/Service'
-        elif any(kw in text_lower for kw in ['fraud', 'cbn', 'efcc', 'fine', 'court', 'scam', 'allegation', 'rift', 'lawsuit', 'crisis', 'vulnerability', 'sanction', 'erosion']):
-            item['theme'] = 'Legal/Risk'
-        else:
-            item['theme'] = 'General News'
-        themes.append(item['theme'])
-
-        # 3. Find Mentioned Brands (for SOV)
-        present_brands_in_item = set()
-        for b_name in all_brands_list:
-            if re.search(r'\b' + re.escape(b_name.lower()) + r'\b', text_lower):
-                present_brands_in_item.add(b_name)
-        
-        item['mentioned_brands'] = list(present_brands_in_item) # Save to item
-        
-        for b_name in present_brands_in_item:
-            brand_counts[b_name] += 1
-    # --- End of Loop ---
-    
+
+    # Lowercase every mention once; sentiment, themes, brands and MPI all reuse it
+    text_col = df['text'] if 'text' in df.columns else pd.Series('', index=df.index)
+    text_lower = text_col.fillna('').astype(str).str.lower()
+
+    # 1 & 2. Perform Sentiment and Thematic Analysis (Live) - one keyword scan per mention
+    flags = np.array(_keyword_flags_all(text_lower.tolist()), dtype=np.int64)
+    anger = (flags & _SENTIMENT_BITS['anger']) != 0
+    neg = (flags & _SENTIMENT_BITS['negative']) != 0
+    pos = (flags & _SENTIMENT_BITS['positive']) != 0
+    app = (flags & _SENTIMENT_BITS['appreciation']) != 0
+    mixed = (flags & _SENTIMENT_BITS['mixed']) != 0
+    # Same priority ladder as _sentiment_from_flags
+    df['sentiment'] = pd.Categorical(np.select(
+        [anger, (pos & neg) | (mixed & (pos | neg)), neg, pos, app],
+        ['anger', 'mixed', 'negative', 'positive', 'appreciation'],
+        default='neutral'
+    ), dtype=SENTIMENT_DTYPE)
+    df['theme'] = pd.Categorical(np.select(
+        [(flags & bit) != 0 for _, bit in _THEME_BITS],
+        [theme for theme, _ in _THEME_BITS],
+        default='General News'
+    ), dtype=THEME_DTYPE)
+
+    # 3. Find Mentioned Brands (for SOV) - one alternation, one scan per mention
+    brand_names = list(dict.fromkeys(all_brands_list))
+    brand_re = _brand_pattern(tuple(brand_names))
+    group_to_brand = {f'b{i}': b_name for i, b_name in enumerate(brand_names)}
+
+    def find_brands(t):
+        found = {group_to_brand[g] for m in brand_re.finditer(t) for g, hit in m.groupdict().items() if hit is not None}
+        return [b for b in brand_names if b in found]
+
+    df['mentioned_brands'] = text_lower.map(find_brands)
+    brand_counts = Counter(b for present in df['mentioned_brands'] for b in present)
+
     # Find all unique brands mentioned
     all_brands_in_data = set(brand_counts.keys())
     for b in all_brands_list: # Ensure the core brands are included
@@ -175,48 +344,31 @@ def compute_kpis(full_data, campaign_messages, brand, competitors):
     total_appearances = sum(brand_counts.values())
     sov = [(brand_counts[b] / total_appearances * 100) if total_appearances > 0 else 0 for b in final_all_brands_list]
 
-    sentiment_counts = Counter(tones)
-    sentiment_ratio = {tone: count / total_mentions * 100 for tone, count in sentiment_counts.items()}
+    # Category-code histograms; labels that never occur are left out
+    sentiment_counts = df['sentiment'].value_counts()
+    sentiment_ratio = {tone: int(count) / total_mentions * 100 for tone, count in sentiment_counts.items() if count}
 
-    theme_counts = Counter(themes)
-    theme_ratio = {theme: count / total_mentions * 100 for theme, count in theme_counts.items()}
+    theme_counts = df['theme'].value_counts()
+    theme_ratio = {theme: int(count) / total_mentions * 100 for theme, count in theme_counts.items() if count}
 
     # --- Other KPIs ---
-    mis = sum(item.get('authority', 5) for item in full_data if item.get('sentiment') in ['positive', 'appreciation'])
-    
-    matches = 0
     if campaign_messages:
         lower_campaign_messages = [msg.lower() for msg in campaign_messages]
-        for item in full_data:
-            if any(msg in item.get('text', '').lower() for msg in lower_campaign_messages):
-                matches += 1
+        matches = int(text_lower.map(lambda t: any(msg in t for msg in lower_campaign_messages)).sum())
         mpi = (matches / total_mentions) * 100 if total_mentions > 0 else 0
     else: mpi = 0
 
-    # --- Safe Engagement Calculation ---
-    social_sources = ['reddit.com', 'fb', 'ig', 'threads', 'twitter', 'x']
-    total_engagement = 0
-    num_social_mentions = 0
-    for item in full_data:
-        if any(s in item.get('source', '').lower() for s in social_sources):
-            try:
-                likes = int(item.get('likes', 0))
-                comments = int(item.get('comments', 0))
-                total_engagement += (likes + comments)
-                num_social_mentions += 1
-            except (ValueError, TypeError): continue
-                
+    # --- MIS, Safe Engagement and Safe Reach (one fused numeric pass) ---
+    source_lower = df['source'].fillna('').astype(str).str.lower() if 'source' in df.columns else pd.Series('', index=df.index)
+    mis, total_engagement, num_social_mentions, reach = _kpi_reductions(
+        authority=_numeric_column(df, 'authority', 5).to_numpy(np.float64),
+        likes=_numeric_column(df, 'likes', 0).to_numpy(np.float64),
+        comments=_numeric_column(df, 'comments', 0).to_numpy(np.float64),
+        reach=_numeric_column(df, 'reach', 0).to_numpy(np.float64),
+        is_favourable=df['sentiment'].isin(['positive', 'appreciation']).to_numpy(bool),
+        is_social=source_lower.str.contains(_SOCIAL_RE).to_numpy(bool),
+    )
     engagement_rate = total_engagement / num_social_mentions if num_social_mentions > 0 else 0
-    
-    # --- Safe Reach Calculation ---
-    reach = 0
-    for item in full_data:
-        try:
-            reach_val = item.get('reach', 0)
-            if pd.isna(reach_val): reach_val = 0
-            reach += int(reach_val)
-        except (ValueError, TypeError):
-            continue
 
     return {
         'sentiment_ratio': sentiment_ratio,
@@ -227,5 +379,5 @@ def compute_kpis(full_data, campaign_messages, brand, competitors):
         'engagement_rate': engagement_rate,
         'reach': reach,
         'all_brands': final_all_brands_list,
-        'analyzed_data': full_data # Return the data with sentiments/themes added
+        'analyzed_data': df # Return the data with sentiments/themes added
     }
@@ -1,21 +1,6 @@
 import streamlit as st
-import base64
 import os
-
-# --- Helper function to load images for CSS ---
-@st.cache_data
-def get_base64_of_bin_file(bin_file):
-    """ Reads a binary file and returns its Base64 encoded string. """
-    try:
-        with open(bin_file, 'rb') as f:
-            data = f.read()
-        return base64.b64encode(data).decode()
-    except FileNotFoundError:
-        print(f"Image file not found: {bin_file}")
-        return None
-    except Exception as e:
-        print(f"Error loading image {bin_file}: {e}")
-        return None
+import threading
 
 # --- Page Configuration (Set first) ---
 st.set_page_config(
@@ -32,70 +17,94 @@ BEIGE = "#F5F5DC"
 DARK_BG = "#1E1E1E"
 LIGHT_TEXT = "#EAEAEA"
 
-# --- Load Background Image ---
-bg_image_base64 = get_base64_of_bin_file("fn text.jpeg")
-
-bg_image_css = f"""
-    /* Semi-Transparent Watermark */
-    .stApp::before {{
-        content: "";
-        position: fixed;
-        top: 0; left: 0;
-        width: 100vw;
-        height: 100vh;
-        background-image: url("data:image/jpeg;base64,{bg_image_base64}");
-        background-position: center;
-        background-repeat: no-repeat;
-        background-size: cover; 
-        opacity: 0.05;
-        z-index: -1;
-    }}
-"""
-
-custom_css = f"""
-<style>
-    {bg_image_css if bg_image_base64 else "/* Background image not found */"}
-
-    .stApp {{ background-color: transparent; color: {LIGHT_TEXT}; }}
-    [data-testid="stAppViewContainer"] > .main {{ background-color: {DARK_BG}; }}
-    [data-testid="stSidebar"] {{ display: none; }}
-
-    /* This centers the login box vertically */
-    .st-emotion-cache-1jicfl2 {{
-        display: flex;
-        flex-direction: column;
-        justify-content: center;
-        min-height: 80vh;
-    }}
-
-    .login-container {{
-        background-color: {BLACK};
-        border: 1px solid {GOLD};
-        border-radius: 10px;
-        padding: 2.5rem 2rem;
-        box-shadow: 0px 4px 15px rgba(255, 215, 0, 0.1);
-    }}
-    
-    /* This rule was bad and has been removed. We will center the image with columns. */
-
-    .login-container h1, .login-container h2, .login-container h3 {{
-        color: {GOLD};
-        text-align: center;
-    }}
-    .login-container h3 {{ color: {BEIGE}; font-weight: 300; }}
-
-    .stButton>button {{
-        width: 100%; background-color: {GOLD}; color: {BLACK};
-        border: 1px solid {GOLD}; border-radius: 5px;
-        font-weight: bold; font-size: 1.1em;
-        margin-top: 1.5rem; /* <-- THIS REPLACES st.empty() */
-    }}
-    .stButton>button:hover {{ background-color: {BLACK}; color: {GOLD}; border: 1px solid {GOLD}; }}
-    .stTextInput input {{ background-color: {DARK_BG}; color: {LIGHT_TEXT}; border: 1px solid {BEIGE}; }}
-    .stTextInput label, .stCheckbox label {{ color: {LIGHT_TEXT} !important; }}
-</style>
-"""
-st.markdown(custom_css, unsafe_allow_html=True)
+@st.cache_resource
+def build_css():
+    """ Builds the page CSS once per server process; main() renders it on every run. """
+    # --- Load Background Image ---
+    # Served by Streamlit static file serving (see .streamlit/config.toml)
+    bg_image_available = os.path.exists("static/fn_text.jpeg")
+
+    bg_image_css = f"""
+        /* Semi-Transparent Watermark */
+        .stApp::before {{
+            content: "";
+            position: fixed;
+            top: 0; left: 0;
+            width: 100vw;
+            height: 100vh;
+            background-image: url('./app/static/fn_text.jpeg');
+            background-position: center;
+            background-repeat: no-repeat;
+            background-size: cover; 
+            opacity: 0.05;
+            z-index: -1;
+        }}
+    """
+
+    custom_css = f"""
+    <style>
+        {bg_image_css if bg_image_available else "/* Background image not found */"}
+
+        .stApp {{ background-color: transparent; color: {LIGHT_TEXT}; }}
+        [data-testid="stAppViewContainer"] > .main {{ background-color: {DARK_BG}; }}
+        [data-testid="stSidebar"] {{ display: none; }}
+
+        /* This centers the login box vertically */
+        .st-emotion-cache-1jicfl2 {{
+            display: flex;
+            flex-direction: column;
+            justify-content: center;
+            min-height: 80vh;
+        }}
+
+        .login-container {{
+            background-color: {BLACK};
+            border: 1px solid {GOLD};
+            border-radius: 10px;
+            padding: 2.5rem 2rem;
+            box-shadow: 0px 4px 15px rgba(255, 215, 0, 0.1);
+        }}
+
+        /* This rule was bad and has been removed. We will center the image with columns. */
+
+        .login-container h1, .login-container h2, .login-container h3 {{
+            color: {GOLD};
+            text-align: center;
+        }}
+        .login-container h3 {{ color: {BEIGE}; font-weight: 300; }}
+
+        .stButton>button {{
+            width: 100%; background-color: {GOLD}; color: {BLACK};
+            border: 1px solid {GOLD}; border-radius: 5px;
+            font-weight: bold; font-size: 1.1em;
+            margin-top: 1.5rem; /* <-- THIS REPLACES st.empty() */
+        }}
+        .stButton>button:hover {{ background-color: {BLACK}; color: {GOLD}; border: 1px solid {GOLD}; }}
+        .stTextInput input {{ background-color: {DARK_BG}; color: {LIGHT_TEXT}; border: 1px solid {BEIGE}; }}
+        .stTextInput label, .stCheckbox label {{ color: {LIGHT_TEXT} !important; }}
+    </style>
+    """
+    return custom_css
+
+@st.cache_resource
+def start_analysis_warmup():
+    """
+    Imports and exercises the analysis/report modules in a background thread
+    (once per server process) so the NLTK stopwords, pandas, ReportLab and the keyword
+    patterns are loaded while the user is still logging in.
+    """
+    def warmup():
+        try:
+            import analysis, report_gen, demo_loader
+            analysis.compute_kpis([{'text': 'warm-up mention', 'source': 'warmup'}], ['warm-up'], 'Brand', [])
+            analysis.get_stop_words()
+            print("Analysis warm-up finished.")
+        except Exception as e:
+            print(f"Analysis warm-up failed: {e}")
+
+    thread = threading.Thread(target=warmup, name="analysis-warmup", daemon=True)
+    thread.start()
+    return thread
 
 def login_form():
     """Creates and handles the login form, centered on the page."""
@@ -130,9 +139,12 @@ def login_form():
 
 def main():
     """Main app router."""
+    st.markdown(build_css(), unsafe_allow_html=True)
     if "logged_in" not in st.session_state:
         st.session_state["logged_in"] = False
 
+    start_analysis_warmup()
+
     if st.session_state["logged_in"]:
         st.success("Login Successful! Redirecting to dashboard...")
         st.switch_page("pages/dashboard.py")
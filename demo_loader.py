@@ -8,23 +8,28 @@ SUMMARY_FILE = "demo_ai_summary.txt"
 
 # --- Main Functions ---
 
-@st.cache_data(ttl=600) # Cache the data for 10 minutes
 def load_data_from_csv():
+    """
+    Loads the demo data from the CSV file, re-parsing it only when the file
+    changes (the cache is keyed on its modification time).
+    """
+    try:
+        csv_mtime = os.path.getmtime(DATA_FILE)
+    except OSError:
+        csv_mtime = None # Missing file: reported by _load_csv
+    return _load_csv(csv_mtime)
+
+@st.cache_data(ttl=3600, show_spinner=False) # Cache the parsed data for 1 hour per file version
+def _load_csv(csv_mtime):
     """
     Loads the demo data from the CSV file.
     - Case-insensitive headers.
     - Renames "Mention Text" to "text".
-    - Safely cleans and converts Likes, Comments, and Reach to numbers.
+    - Parses Likes, Comments, and Reach as numbers (e.g. "50,000") in the CSV reader.
     - Adds default 'authority' and 'theme' if missing.
     """
     try:
-        df = pd.read_csv(DATA_FILE)
-        
-        # --- NEW ROBUST LOADER ---
-        # 1. Standardize all column headers: lowercase and stripped of spaces
-        df.columns = [str(col).lower().strip() for col in df.columns]
-
-        # 2. Define the mapping from YOUR CSV to what the APP EXPECTS
+        # 1. Define the mapping from YOUR CSV to what the APP EXPECTS
         column_map = {
             "date": "date",
             "source": "source",
@@ -33,11 +38,24 @@ def load_data_from_csv():
             "likes": "likes",
             "comments": "comments",
             "reach": "reach",
-            "headline": "headline"
-            # We will IGNORE 'headline' and 'mentioned_brand'
+            "headline": "headline",
+            "authority": "authority",
+            "theme": "theme"
+            # 'mentioned_brand' and any other columns are never loaded
         }
-        
-        # 3. Rename the columns we care about
+
+        # 2. Parse only the columns we use; the C parser strips the
+        #    thousands separators ("50,000") and treats blanks as NaN
+        df = pd.read_csv(
+            DATA_FILE,
+            usecols=lambda col: str(col).lower().strip() in column_map,
+            thousands=',',
+            na_values=['', ' ', 'NA'],
+            engine='c'
+        )
+
+        # 3. Standardize headers (lowercase, stripped) and rename the columns we care about
+        df.columns = [str(col).lower().strip() for col in df.columns]
         df = df.rename(columns=column_map)
 
         # 4. Check for essential columns (text, date, source)
@@ -45,7 +63,7 @@ def load_data_from_csv():
         missing_essentials = set(required_cols) - set(df.columns)
         if missing_essentials:
             st.error(f"Demo data CSV is invalid! It MUST contain: {', '.join(required_cols)}")
-            return []
+            return pd.DataFrame()
 
         # 5. Add default values for optional KPI columns if they weren't found
         if 'likes' not in df.columns: df['likes'] = 0
@@ -54,27 +72,20 @@ def load_data_from_csv():
         if 'authority' not in df.columns: df['authority'] = 5
         if 'theme' not in df.columns: df['theme'] = 'General News' # Will be overwritten
 
-        # 6. --- CRITICAL: Clean the numeric columns ---
-        # This fixes the "50,000" and empty (,,) problems
+        # 6. Empty cells (,,) in numeric columns become 0
         for col in ['likes', 'comments', 'reach']:
-            if col in df.columns:
-                # Convert to string, remove quotes, remove commas
-                df[col] = df[col].astype(str).str.replace('"', '').str.replace(',', '')
-                # Fill empty/NaN values with '0'
-                df[col] = df[col].fillna('0')
-                # Convert to numeric, forcing errors to 0
+            if not pd.api.types.is_integer_dtype(df[col]):
                 df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
-        # --- END OF CLEANING ---
             
         print("Demo data loaded, cleaned, and columns mapped successfully.")
-        return df.to_dict('records')
+        return df
         
     except FileNotFoundError:
         st.error(f"FATAL: '{DATA_FILE}' not found! Please add it to the root folder.")
-        return []
+        return pd.DataFrame()
     except Exception as e:
         st.error(f"An error occurred while loading {DATA_FILE}: {e}")
-        return []
+        return pd.DataFrame()
 
 @st.cache_data(ttl=3600) # Cache the summary for 1 hour
 def load_ai_summary():
@@ -103,15 +114,15 @@ def load_ai_summary():
 if __name__ == "__main__":
     print("Running demo_loader.py self-test...")
     data = load_data_from_csv()
-    if data:
+    if not data.empty:
         print(f"Successfully loaded {len(data)} mentions.")
         print("First mention sample (after cleaning):")
-        if data[0]:
-            print({
-                'text': data[0].get('text', 'N/A')[:50] + "...",
-                'reach': data[0].get('reach', 'N/A'),
-                'likes': data[0].get('likes', 'N/A'),
-                'comments': data[0].get('comments', 'N/A')
-            })
+        first = data.iloc[0]
+        print({
+            'text': str(first.get('text', 'N/A'))[:50] + "...",
+            'reach': first.get('reach', 'N/A'),
+            'likes': first.get('likes', 'N/A'),
+            'comments': first.get('comments', 'N/A')
+        })
     else:
         print("Data loading FAILED.")
\ No newline at end of file
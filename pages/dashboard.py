@@ -1,27 +1,16 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
+from plotly.colors import qualitative
 import traceback
 import io
 from collections import Counter
 import os
-import base64 # Import Base64
-
-# --- Helper function to load images for CSS ---
-@st.cache_data
-def get_base64_of_bin_file(bin_file):
-    """ Reads a binary file and returns its Base64 encoded string. """
-    try:
-        # The path must be relative to the root of the project
-        with open(bin_file, 'rb') as f:
-            data = f.read()
-        return base64.b64encode(data).decode()
-    except FileNotFoundError:
-        print(f"Image file not found: {bin_file}")
-        return None
-    except Exception as e:
-        print(f"Error loading image {bin_file}: {e}")
-        return None
+import importlib
+from functools import partial
+import tempfile
+import atexit
+import time
 
 # --- Page Config (MUST be first Streamlit command) ---
 st.set_page_config(
@@ -31,127 +20,157 @@ st.set_page_config(
 )
 
 # --- Imports (Relative imports) ---
+# report_gen (ReportLab) and servicenow_integration (requests/Slack)
+# are heavy and only needed on demand; they are loaded via _lazy_import.
 try:
     from .. import analysis
-    from .. import report_gen
     from .. import demo_loader # Use our offline loader
-    from .. import servicenow_integration # For alert simulation
 except ImportError:
     # Fallback for local testing
-    import analysis, report_gen, demo_loader, servicenow_integration
+    import analysis, demo_loader
 except Exception as e:
     st.error(f"Failed to import modules: {e}")
     st.stop()
 
+def _lazy_import(name):
+    """ Imports one of the app's modules on first use, with the same relative/local fallback. """
+    try:
+        return importlib.import_module(f"..{name}", __package__)
+    except (ImportError, TypeError):
+        return importlib.import_module(name)
+
 
 # --- Brand Colors & Custom CSS ---
 GOLD = "#FFD700"; BLACK = "#000000"; BEIGE = "#F5F5DC"
 DARK_BG = "#1E1E1E"; LIGHT_TEXT = "#EAEAEA"
 GREEN_BG = "#28a745"; RED_BG = "#dc3545"
 
-# --- Load Background Image ---
-bg_image_base64 = get_base64_of_bin_file("fn text.jpeg") 
-
-bg_image_css = f"""
-    /* --- NEW: Semi-Transparent Watermark --- */
-    .stApp::before {{
-        content: "";
-        position: fixed;
-        top: 0; left: 0;
-        width: 100vw;
-        height: 100vh;
-        background-image: url("data:image/jpeg;base64,{bg_image_base64}");
-        background-position: center;
-        background-repeat: no-repeat;
-        background-size: cover; 
-        opacity: 0.05; /* 5% transparent */
-        z-index: -1; 
-    }}
-"""
-
-custom_css = f"""
-<style>
-    {bg_image_css if bg_image_base64 else "/* Background image not found */"}
-
-    /* Main App Background */
-    .stApp {{ background-color: transparent; color: {LIGHT_TEXT}; }}
-    [data-testid="stAppViewContainer"] > .main {{ background-color: {DARK_BG}; }}
-    
-    /* Sidebar */
-    [data-testid="stSidebar"] > div:first-child {{ background-color: {BLACK}; border-right: 1px solid {GOLD}; }}
-    [data-testid="stSidebar"] .st-emotion-cache-16txtl3 {{ color: {BEIGE}; }}
-    [data-testid="stSidebar"] h1, [data-testid="stSidebar"] h2, [data-testid="stSidebar"] h3 {{ color: {GOLD}; }}
-    /* Main Content Headers */
-    .stApp h1, .stApp h2, .stApp h3 {{ color: {GOLD}; }}
-    /* Buttons */
-    .stButton>button {{ background-color: {GOLD}; color: {BLACK}; border: 1px solid {GOLD}; border-radius: 5px; padding: 0.5em 1em; }}
-    .stButton>button:hover {{ background-color: {BLACK}; color: {GOLD}; border: 1px solid {GOLD}; }}
-    /* Inputs */
-    .stTextInput input, .stTextArea textarea, .stNumberInput input {{ background-color: {DARK_BG}; color: {LIGHT_TEXT}; border: 1px solid {BEIGE}; border-radius: 5px; }}
-    /* Selectbox */
-    .stSelectbox div[data-baseweb="select"] > div {{ background-color: {DARK_BG}; color: {LIGHT_TEXT}; border: 1px solid {BEIGE}; }}
-    /* Dataframes */
-    .stDataFrame {{ border: 1px solid {BEIGE}; border-radius: 5px; }}
-    .stDataFrame thead th {{ background-color: {BLACK}; color: {GOLD}; }}
-    .stDataFrame tbody tr {{ background-color: {DARK_BG}; color: {LIGHT_TEXT}; }}
-    .stDataFrame tbody tr:nth-child(even) {{ background-color: #2a2a2a; }}
-    /* Expander */
-    .streamlit-expanderHeader {{ background-color: {BLACK}; color: {GOLD}; border: 1px solid {GOLD}; border-radius: 5px; }}
-    /* KPI Boxes */
-    .kpi-box {{ border: 1px solid {BEIGE}; border-radius: 5px; padding: 15px; text-align: center; margin-bottom: 10px; background-color: {DARK_BG}; }}
-    .kpi-box .label {{ font-size: 0.9em; color: {BEIGE}; margin-bottom: 5px; text-transform: uppercase; line-height: 1.2; height: 2.4em; display: flex; align-items: center; justify-content: center; }}
-    .kpi-box .value {{ font-size: 1.5em; font-weight: bold; color: {LIGHT_TEXT}; }}
-    .kpi-box.good {{ background-color: {GREEN_BG}; border-color: {GREEN_BG}; }}
-    .kpi-box.good .label, .kpi-box.good .value {{ color: {BLACK}; }}
-    .kpi-box.bad {{ background-color: {RED_BG}; border-color: {RED_BG}; }}
-    .kpi-box.bad .label, .kpi-box.bad .value {{ color: {LIGHT_TEXT}; }}
-    
-    /* --- NEW: Make Title Logo Round --- */
-    div[data-testid="stHorizontalBlock"]:first-of-type [data-testid="stImage"] img {{
-        border-radius: 50%; /* Make it a circle */
-        border: 2px solid {GOLD}; /* Add gold border */
-        box-shadow: 0 0 10px {GOLD}; /* Add a glow */
-    }}
-</style>
-"""
-st.markdown(custom_css, unsafe_allow_html=True)
+# One KPI box (see .kpi-box in the CSS below)
+_KPI_TPL = '<div class="kpi-box {cls}"><div class="label">{label}</div><div class="value">{val}</div></div>'
+
+@st.cache_resource
+def build_css():
+    """ Builds the page CSS once per server process; main() renders it on every run. """
+    # --- Load Background Image ---
+    # Served by Streamlit static file serving (see .streamlit/config.toml)
+    bg_image_available = os.path.exists("static/fn_text.jpeg")
+
+    bg_image_css = f"""
+        /* --- NEW: Semi-Transparent Watermark --- */
+        .stApp::before {{
+            content: "";
+            position: fixed;
+            top: 0; left: 0;
+            width: 100vw;
+            height: 100vh;
+            background-image: url('./app/static/fn_text.jpeg');
+            background-position: center;
+            background-repeat: no-repeat;
+            background-size: cover; 
+            opacity: 0.05; /* 5% transparent */
+            z-index: -1; 
+        }}
+    """
+
+    custom_css = f"""
+    <style>
+        {bg_image_css if bg_image_available else "/* Background image not found */"}
+
+        /* Main App Background */
+        .stApp {{ background-color: transparent; color: {LIGHT_TEXT}; }}
+        [data-testid="stAppViewContainer"] > .main {{ background-color: {DARK_BG}; }}
+
+        /* Sidebar */
+        [data-testid="stSidebar"] > div:first-child {{ background-color: {BLACK}; border-right: 1px solid {GOLD}; }}
+        [data-testid="stSidebar"] .st-emotion-cache-16txtl3 {{ color: {BEIGE}; }}
+        [data-testid="stSidebar"] h1, [data-testid="stSidebar"] h2, [data-testid="stSidebar"] h3 {{ color: {GOLD}; }}
+        /* Main Content Headers */
+        .stApp h1, .stApp h2, .stApp h3 {{ color: {GOLD}; }}
+        /* Buttons */
+        .stButton>button {{ background-color: {GOLD}; color: {BLACK}; border: 1px solid {GOLD}; border-radius: 5px; padding: 0.5em 1em; }}
+        .stButton>button:hover {{ background-color: {BLACK}; color: {GOLD}; border: 1px solid {GOLD}; }}
+        /* Inputs */
+        .stTextInput input, .stTextArea textarea, .stNumberInput input {{ background-color: {DARK_BG}; color: {LIGHT_TEXT}; border: 1px solid {BEIGE}; border-radius: 5px; }}
+        /* Selectbox */
+        .stSelectbox div[data-baseweb="select"] > div {{ background-color: {DARK_BG}; color: {LIGHT_TEXT}; border: 1px solid {BEIGE}; }}
+        /* Dataframes */
+        .stDataFrame {{ border: 1px solid {BEIGE}; border-radius: 5px; }}
+        .stDataFrame thead th {{ background-color: {BLACK}; color: {GOLD}; }}
+        .stDataFrame tbody tr {{ background-color: {DARK_BG}; color: {LIGHT_TEXT}; }}
+        .stDataFrame tbody tr:nth-child(even) {{ background-color: #2a2a2a; }}
+        /* Expander */
+        .streamlit-expanderHeader {{ background-color: {BLACK}; color: {GOLD}; border: 1px solid {GOLD}; border-radius: 5px; }}
+        /* KPI Boxes */
+        .kpi-row {{ display: flex; gap: 1rem; }}
+        .kpi-row .kpi-box {{ flex: 1; }}
+        .kpi-box {{ border: 1px solid {BEIGE}; border-radius: 5px; padding: 15px; text-align: center; margin-bottom: 10px; background-color: {DARK_BG}; }}
+        .kpi-box .label {{ font-size: 0.9em; color: {BEIGE}; margin-bottom: 5px; text-transform: uppercase; line-height: 1.2; height: 2.4em; display: flex; align-items: center; justify-content: center; }}
+        .kpi-box .value {{ font-size: 1.5em; font-weight: bold; color: {LIGHT_TEXT}; }}
+        .kpi-box.good {{ background-color: {GREEN_BG}; border-color: {GREEN_BG}; }}
+        .kpi-box.good .label, .kpi-box.good .value {{ color: {BLACK}; }}
+        .kpi-box.bad {{ background-color: {RED_BG}; border-color: {RED_BG}; }}
+        .kpi-box.bad .label, .kpi-box.bad .value {{ color: {LIGHT_TEXT}; }}
+
+        /* --- NEW: Make Title Logo Round --- */
+        div[data-testid="stHorizontalBlock"]:first-of-type [data-testid="stImage"] img {{
+            border-radius: 50%; /* Make it a circle */
+            border: 2px solid {GOLD}; /* Add gold border */
+            box-shadow: 0 0 10px {GOLD}; /* Add a glow */
+        }}
+    </style>
+    """
+    return custom_css
 
 
+@st.cache_data(ttl=600, show_spinner=False)
+def cached_compute_kpis(csv_mtime, csv_size, brand, competitors, campaign_messages):
+    """
+    Loads the demo CSV and computes the KPIs. Keyed on the CSV's mtime/size
+    and the inputs (as tuples) instead of hashing the data itself, so widget
+    reruns with unchanged inputs skip the analysis.
+    """
+    full_data = demo_loader.load_data_from_csv()
+    if full_data.empty:
+        return {}
+    return analysis.compute_kpis(
+        full_data=full_data,
+        campaign_messages=list(campaign_messages),
+        brand=brand,
+        competitors=list(competitors)
+    )
+
+@st.cache_data(ttl=600, show_spinner=False)
+def cached_extract_keywords(all_text, brand, competitors):
+    """ Top keywords/phrases; a pure function of its inputs, so re-runs are served from cache. """
+    return analysis.extract_keywords(all_text, brand, list(competitors))
+
+def build_recent_mentions(full_data, limit=30):
+    """ The 'Recent Mentions' table, built once per analysis instead of on every rerun. """
+    recent = full_data.head(limit)
+    return pd.DataFrame({'Sentiment': recent['sentiment'], 'Theme': recent['theme'], 'Source': recent['source'], 'Mention': recent['text'].fillna('').astype(str).str[:150] + "...", 'Link': recent['link'] if 'link' in recent.columns else '#'})
+
 def run_analysis_from_demo(brand, competitors, campaign_messages):
     """
     Runs the full analysis using ONLY the local demo CSV file.
     """
     try:
-        with st.spinner("Loading demo data..."):
-            full_data = demo_loader.load_data_from_csv()
-        if not full_data:
+        try:
+            csv_stat = os.stat(demo_loader.DATA_FILE)
+        except OSError:
             st.error("Demo data file 'demo_data.csv' is missing or empty!"); st.stop()
 
-        with st.spinner("Analyzing data and calculating KPIs..."):
-            kpi_results = analysis.compute_kpis(
-                full_data=full_data,
-                campaign_messages=campaign_messages,
-                brand=brand,
-                competitors=competitors
-            )
+        with st.spinner("Loading demo data and calculating KPIs..."):
+            kpi_results = cached_compute_kpis(csv_stat.st_mtime, csv_stat.st_size, brand, tuple(competitors), tuple(campaign_messages))
+        if not kpi_results:
+            st.error("Demo data file 'demo_data.csv' is missing or empty!"); st.stop()
         
         st.session_state.kpis = kpi_results
-        st.session_state.full_data = kpi_results.get('analyzed_data', [])
-        all_text = " ".join([item.get("text", "") for item in st.session_state.full_data])
+        st.session_state.full_data = kpi_results.get('analyzed_data', pd.DataFrame())
+        st.session_state.recent_mentions = build_recent_mentions(st.session_state.full_data)
+        all_text = st.session_state.full_data['text'].fillna('').astype(str).str.cat(sep=' ') if 'text' in st.session_state.full_data.columns else ""
         
-        # Safely update stopwords and extract keywords
-        if hasattr(analysis, 'stop_words') and isinstance(analysis.stop_words, set):
-            temp_stop_words = analysis.stop_words.copy()
-            temp_stop_words.add(brand.lower())
-            for c in competitors:
-                temp_stop_words.add(c.lower())
-            
-            original_stopwords = analysis.stop_words
-            analysis.stop_words = temp_stop_words
-            st.session_state.top_keywords = analysis.extract_keywords(all_text, brand, competitors)
-            analysis.stop_words = original_stopwords
-        else:
-            st.session_state.top_keywords = analysis.extract_keywords(all_text, brand, competitors)
+        # Brand and competitor names are excluded inside extract_keywords
+        st.session_state.top_keywords = cached_extract_keywords(all_text, brand, tuple(competitors))
 
         st.success("Analysis Complete!")
 
@@ -161,6 +180,7 @@ def run_analysis_from_demo(brand, competitors, campaign_messages):
             alert_msg = f"SIMULATED ALERT: High negative sentiment ({neg_pct:.1f}%) detected for {brand}."
             st.error(alert_msg)
             alert_email = os.getenv("ALERT_EMAIL", 'alerts@yourcompany.com')
+            servicenow_integration = _lazy_import('servicenow_integration') # For alert simulation
             servicenow_integration.send_alert(alert_msg, channel='#alerts', to_email=alert_email)
             servicenow_integration.create_servicenow_ticket(f"PR Crisis Alert: {brand}", alert_msg, urgency='1', impact='1')
 
@@ -168,94 +188,140 @@ def run_analysis_from_demo(brand, competitors, campaign_messages):
         st.error(f"An error occurred during analysis:\n{traceback.format_exc()}")
 
 
-def display_dashboard(brand, competitors, time_range_text, thresholds):
-    """ Displays KPIs with conditional styling, charts, tables, and reports. """
-    if not st.session_state.kpis:
-        st.info("Click 'Run Analysis' to load your brand data."); return
+def build_pdf_bytes(**report_kwargs):
+    """ Returns the PDF report bytes (report_gen is imported here, on first use). """
+    report_gen = _lazy_import('report_gen')
+    md, pdf_bytes = report_gen.generate_report(**report_kwargs)
+    return pdf_bytes
+
+def build_excel_bytes(full_data):
+    """ Returns the mentions sheet as .xlsx bytes. """
+    excel_columns = {'date': 'Date', 'sentiment': 'Sentiment', 'theme': 'Theme', 'source': 'Source', 'text': 'Mention Text', 'link': 'Link', 'likes': 'Likes', 'comments': 'Comments', 'reach': 'Reach'}
+    df_excel = full_data.reindex(columns=list(excel_columns)).rename(columns=excel_columns); output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer: df_excel.to_excel(writer, index=False, sheet_name='Mentions')
+    return output.getvalue()
+
+def _bar_colors(n):
+    """ One color per bar from Plotly's default palette (as px.bar(color=...) would assign). """
+    return [qualitative.Plotly[i % len(qualitative.Plotly)] for i in range(n)]
+
+@st.cache_data(show_spinner=False)
+def sentiment_pie_figure(sentiment_items):
+    """ Sentiment donut as a plain figure dict, built with graph_objects and reused across reruns. """
+    color_map = {'positive': 'green', 'appreciation': 'blue', 'neutral': 'grey', 'mixed': 'orange', 'negative': 'red', 'anger': 'darkred'}
+    labels = [tone for tone, _ in sentiment_items]
+    fig = go.Figure(go.Pie(labels=labels, values=[pct for _, pct in sentiment_items], hole=0.4, marker=dict(colors=[color_map.get(tone, 'grey') for tone in labels])))
+    fig.update_layout(title_text="Sentiment Distribution", legend_title_text="Sentiment")
+    return fig.to_dict()
+
+@st.cache_data(show_spinner=False)
+def bar_figure(labels, values, title, x_title, y_title):
+    """ One-color-per-bar chart as a plain figure dict, reused across reruns with the same data. """
+    fig = go.Figure(go.Bar(x=list(labels), y=list(values), marker_color=_bar_colors(len(labels))))
+    fig.update_layout(title_text=title, xaxis_title=x_title, yaxis_title=y_title)
+    return fig.to_dict()
+
+# Saved reports older than this belong to sessions that ended (tab closed, timed out) without cleaning up
+_REPORT_FILE_MAX_AGE = 24 * 60 * 60
+
+@st.cache_resource
+def _report_dir():
+    """ Per-process directory for saved reports, removed with everything in it when the server exits. """
+    report_dir = tempfile.TemporaryDirectory(prefix="flash_narrative_")
+    atexit.register(report_dir.cleanup)
+    return report_dir
+
+def _sweep_stale_report_files(directory):
+    """ Deletes saved reports past _REPORT_FILE_MAX_AGE. """
+    cutoff = time.time() - _REPORT_FILE_MAX_AGE
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+def save_report_file(data, suffix):
+    """ Writes report bytes to a temp file and returns its path (session state keeps only the path). """
+    directory = _report_dir().name
+    _sweep_stale_report_files(directory)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, prefix="flash_narrative_", dir=directory) as f:
+        f.write(data)
+        return f.name
+
+def read_report_file(path):
+    """ Reads a saved report back (for download/email). """
+    with open(path, 'rb') as f:
+        return f.read()
+
+def discard_report_files():
+    """ Deletes this session's saved report files and clears their paths. """
+    for key in ('pdf_report_path', 'excel_report_path'):
+        path = st.session_state.get(key)
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        st.session_state[key] = None
+
+@st.fragment
+def render_kpi_section(kpis):
+    """
+    KPI threshold inputs and KPI boxes. Running as a fragment, a threshold
+    change reruns only this block instead of the whole dashboard.
+    """
+    with st.expander("⚙️ KPI Thresholds (Good ≥)"):
+        t_col1, t_col2, t_col3, t_col4 = st.columns(4)
+        # --- UPDATED DEFAULTS ---
+        with t_col1: mis_threshold = st.number_input("Media Impact Score (MIS)", min_value=0, value=100, step=10, key="mis_thresh_input")
+        with t_col2: mpi_threshold = st.number_input("Message Penetration (%)", min_value=0, max_value=100, value=30, step=5, key="mpi_thresh_input")
+        with t_col3: eng_threshold = st.number_input("Avg. Social Engagement", min_value=0.0, value=1000.0, step=10.0, format="%.1f", key="eng_thresh_input")
+        with t_col4: reach_threshold = st.number_input("Total Reach", min_value=0, value=10000000, step=10000, key="reach_thresh_input")
+        # --- END UPDATED DEFAULTS ---
 
-    st.subheader("Key Performance Indicators")
-    kpis = st.session_state.kpis
     mis_val = kpis.get('mis', 0); mpi_val = kpis.get('mpi', 0)
     eng_val = kpis.get('engagement_rate', 0); reach_val = kpis.get('reach', 0)
-    
-    # Get thresholds from the passed dictionary
-    mis_threshold = thresholds.get('mis_good', 100)
-    mpi_threshold = thresholds.get('mpi_good', 30) # Use new default
-    eng_threshold = thresholds.get('eng_good', 1000) # Use new default
-    reach_threshold = thresholds.get('reach_good', 10000000) # Use new default
-
-    # Determine CSS classes
-    mis_class = "good" if mis_val >= mis_threshold else "bad"
-    mpi_class = "good" if mpi_val >= mpi_threshold else "bad"
-    eng_class = "good" if eng_val >= eng_threshold else "bad"
-    reach_class = "good" if reach_val >= reach_threshold else "bad"
-    
-    col1, col2, col3, col4 = st.columns(4)
-    with col1: st.markdown(f'<div class="kpi-box {mis_class}"><div class="label">Media Impact (MIS)</div><div class="value">{mis_val:.0f}</div></div>', unsafe_allow_html=True)
-    with col2: st.markdown(f'<div class="kpi-box {mpi_class}"><div class="label">Msg Penetration (MPI)</div><div class="value">{mpi_val:.1f}%</div></div>', unsafe_allow_html=True)
-    with col3: st.markdown(f'<div class="kpi-box {eng_class}"><div class="label">Avg Social Engagement</div><div class="value">{eng_val:.1f}</div></div>', unsafe_allow_html=True)
-    with col4: st.markdown(f'<div class="kpi-box {reach_class}"><div class="label">Total Reach</div><div class="value">{reach_val:,}</div></div>', unsafe_allow_html=True)
-    st.caption(f"Thresholds (Good ≥) MIS: {mis_threshold} | MPI: {mpi_threshold}% | Engagement: {eng_threshold} | Reach: {reach_threshold:,}")
 
-    st.subheader("Visual Analysis")
-    sentiment_ratio = kpis.get("sentiment_ratio", {})
-    if sentiment_ratio:
-        pie_data = pd.DataFrame({'Sentiment': list(sentiment_ratio.keys()), 'Percent': list(sentiment_ratio.values())})
-        color_map = {'positive': 'green', 'appreciation': 'blue', 'neutral': 'grey', 'mixed': 'orange', 'negative': 'red', 'anger': 'darkred'}
-        fig_pie = px.pie(pie_data, names='Sentiment', values='Percent', title="Sentiment Distribution", color='Sentiment', color_discrete_map=color_map, hole=0.4)
-        st.plotly_chart(fig_pie, use_container_width=True)
-    else: st.write("No sentiment data.")
-
-    all_brands = kpis.get("all_brands", [brand] + competitors)
-    sov_values = kpis.get("sov", [])
-    if len(sov_values) != len(all_brands):
-        st.warning(f"SOV data mismatch. Brands: {len(all_brands)}, Values: {len(sov_values)}. Chart may be incomplete.")
-    sov_df = pd.DataFrame({'Brand': all_brands, 'Share of Voice (%)': sov_values})
-    fig_sov = px.bar(sov_df, x='Brand', y='Share of Voice (%)', title="Share of Voice (SOV)", color='Brand')
-    st.plotly_chart(fig_sov, use_container_width=True)
-    
-    theme_ratio = kpis.get("theme_ratio", {})
-    if theme_ratio:
-        theme_data = pd.DataFrame({'Theme': list(theme_ratio.keys()), 'Percent': list(theme_ratio.values())})
-        theme_data = theme_data.sort_values(by='Percent', ascending=False)
-        fig_theme = px.bar(theme_data, x='Theme', y='Percent', title="Top Mention Themes", color='Theme')
-        st.plotly_chart(fig_theme, use_container_width=True)
-    else: st.write("No theme data.")
-
-    st.subheader("Detailed Mentions")
-    st.markdown("**Top Keywords & Phrases**")
-    top_keywords = st.session_state.top_keywords
-    if top_keywords: st.dataframe(pd.DataFrame(top_keywords, columns=['Keyword/Phrase', 'Frequency']), use_container_width=True)
-    else: st.write("- No keywords/phrases.")
+    # Determine CSS classes and render all four boxes in one markdown call
+    kpi_cards = [
+        ("Media Impact (MIS)", mis_val >= mis_threshold, f"{mis_val:.0f}"),
+        ("Msg Penetration (MPI)", mpi_val >= mpi_threshold, f"{mpi_val:.1f}%"),
+        ("Avg Social Engagement", eng_val >= eng_threshold, f"{eng_val:.1f}"),
+        ("Total Reach", reach_val >= reach_threshold, f"{reach_val:,}"),
+    ]
+    kpi_html = "".join(_KPI_TPL.format(cls="good" if is_good else "bad", label=label, val=value) for label, is_good, value in kpi_cards)
+    st.markdown(f'<div class="kpi-row">{kpi_html}</div>', unsafe_allow_html=True)
+    st.caption(f"Thresholds (Good ≥) MIS: {mis_threshold} | MPI: {mpi_threshold}% | Engagement: {eng_threshold} | Reach: {reach_threshold:,}")
 
-    st.markdown("**Recent Mentions (All Brands)**")
-    if st.session_state.full_data:
-        display_data = [{'Sentiment': item.get('sentiment', 'N/A'), 'Theme': item.get('theme', 'N/A'), 'Source': item.get('source', 'N/A'), 'Mention': item.get('text', '')[:150]+"...", 'Link': item.get('link', '#')} for item in st.session_state.full_data[:30]]
-        st.dataframe(pd.DataFrame(display_data), column_config={"Link": st.column_config.LinkColumn("Link", display_text="Source Link")}, use_container_width=True, hide_index=True)
-    else: st.write("No mentions.")
 
+@st.fragment
+def render_report_section(brand, competitors, time_range_text):
+    """
+    Report generation, downloads and email. As a fragment, typing the email
+    address or clicking these buttons reruns only this section, not the charts above.
+    """
     st.subheader("Generate & Send Report")
     recipient_email = st.text_input("Enter Email to Send Reports To:", placeholder="your.email@example.com", key="recipient_email_input")
 
     if st.button("Generate Reports for Email/Download", use_container_width=True, key="generate_reports"):
-        if not st.session_state.kpis or not st.session_state.full_data:
+        if not st.session_state.kpis or st.session_state.full_data.empty:
             st.warning("Please run analysis first."); st.session_state.report_generated = False
         else:
             st.session_state.report_generated = False; pdf_generated = False; excel_generated = False
+            discard_report_files()
             with st.spinner("Building AI Report Summary..."):
                 ai_summary = demo_loader.load_ai_summary() 
                 st.session_state.ai_summary_text = ai_summary
             with st.spinner("Building PDF report..."):
                 try:
-                    md, pdf_bytes = report_gen.generate_report(kpis=st.session_state.kpis, top_keywords=st.session_state.top_keywords, full_articles_data=st.session_state.full_data, brand=brand, competitors=competitors, timeframe_hours=time_range_text, include_json=False)
-                    st.session_state.pdf_report_bytes = pdf_bytes; pdf_generated = True
+                    pdf_bytes = build_pdf_bytes(kpis=st.session_state.kpis, top_keywords=st.session_state.top_keywords, full_articles_data=st.session_state.full_data, brand=brand, competitors=competitors, timeframe_hours=time_range_text, include_json=False)
+                    st.session_state.pdf_report_path = save_report_file(pdf_bytes, '.pdf'); pdf_generated = True
                 except Exception as e: st.error(f"Failed PDF generation: {e}\n{traceback.format_exc()}")
             with st.spinner("Building Excel mentions file..."):
                 try:
-                    excel_data = [{'Date': item.get('date', 'N/A'), 'Sentiment': item.get('sentiment', 'N/A'), 'Theme': item.get('theme', 'N/A'), 'Source': item.get('source', 'N/A'), 'Mention Text': item.get('text', ''), 'Link': item.get('link', '#'), 'Likes': item.get('likes', 0), 'Comments': item.get('comments', 0), 'Reach': item.get('reach', 0)} for item in st.session_state.full_data]
-                    df_excel = pd.DataFrame(excel_data); output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer: df_excel.to_excel(writer, index=False, sheet_name='Mentions')
-                    st.session_state.excel_report_bytes = output.getvalue(); excel_generated = True
+                    st.session_state.excel_report_path = save_report_file(build_excel_bytes(st.session_state.full_data), '.xlsx'); excel_generated = True
                 except Exception as e: st.error(f"Failed Excel generation: {e}")
             if pdf_generated and excel_generated:
                 st.session_state.report_generated = True; st.success("Reports Generated!")
@@ -266,20 +332,21 @@ def display_dashboard(brand, competitors, time_range_text, thresholds):
         st.markdown("---")
         col_dl_pdf, col_dl_excel, col_email = st.columns(3)
         with col_dl_pdf:
-            if st.session_state.get('pdf_report_bytes'): st.download_button("Download PDF", st.session_state.pdf_report_bytes, f"{brand}_Report.pdf", "application/pdf", use_container_width=True, key="pdf_dl")
+            if st.session_state.get('pdf_report_path'): st.download_button("Download PDF", partial(read_report_file, st.session_state.pdf_report_path), f"{brand}_Report.pdf", "application/pdf", use_container_width=True, key="pdf_dl")
             else: st.button("Download PDF", disabled=True, use_container_width=True, help="PDF failed.")
         with col_dl_excel:
-            if st.session_state.get('excel_report_bytes'): st.download_button("Download Excel", st.session_state.excel_report_bytes, f"{brand}_Mentions.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True, key="excel_dl")
+            if st.session_state.get('excel_report_path'): st.download_button("Download Excel", partial(read_report_file, st.session_state.excel_report_path), f"{brand}_Mentions.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True, key="excel_dl")
             else: st.button("Download Excel", disabled=True, use_container_width=True, help="Excel failed.")
         with col_email:
             email_to_send = st.session_state.get("recipient_email_input", "")
-            files_ready = st.session_state.get('pdf_report_bytes') and st.session_state.get('excel_report_bytes')
+            files_ready = st.session_state.get('pdf_report_path') and st.session_state.get('excel_report_path')
             if not email_to_send: st.button("Email Reports", disabled=True, use_container_width=True, help="Enter email.")
             elif not files_ready: st.button("Email Reports", disabled=True, use_container_width=True, help="Files not ready.")
             elif st.button("Email Reports", use_container_width=True, key="email_reports"):
                 with st.spinner(f"Sending to {email_to_send}..."):
                     try:
-                        attachments = [(f"{brand}_Report.pdf", st.session_state.pdf_report_bytes, 'application/pdf'), (f"{brand}_Mentions.xlsx", st.session_state.excel_report_bytes, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')]
+                        servicenow_integration = _lazy_import('servicenow_integration')
+                        attachments = [(f"{brand}_Report.pdf", read_report_file(st.session_state.pdf_report_path), 'application/pdf'), (f"{brand}_Mentions.xlsx", read_report_file(st.session_state.excel_report_path), 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')]
                         subject = f"FlashNarrative Report: {brand} ({time_range_text})"
                         # Use simple body text
                         body = f"Hello!\n\nPlease find attached the requested reports for {brand}.\n\nKind regards,\nThe Flash Narrative Team"
@@ -289,9 +356,50 @@ def display_dashboard(brand, competitors, time_range_text, thresholds):
                     except Exception as e:
                         st.error(f"Email failed. Is 'servicenow_integration.py' missing? Error: {e}")
 
+def display_dashboard(brand, competitors, time_range_text):
+    """ Displays KPIs with conditional styling, charts, tables, and reports. """
+    if not st.session_state.kpis:
+        st.info("Click 'Run Analysis' to load your brand data."); return
+
+    st.subheader("Key Performance Indicators")
+    render_kpi_section(st.session_state.kpis)
+    kpis = st.session_state.kpis
+
+    st.subheader("Visual Analysis")
+    sentiment_ratio = kpis.get("sentiment_ratio", {})
+    if sentiment_ratio:
+        st.plotly_chart(sentiment_pie_figure(tuple(sentiment_ratio.items())), use_container_width=True)
+    else: st.write("No sentiment data.")
+
+    all_brands = kpis.get("all_brands", [brand] + competitors)
+    sov_values = kpis.get("sov", [])
+    if len(sov_values) != len(all_brands):
+        st.warning(f"SOV data mismatch. Brands: {len(all_brands)}, Values: {len(sov_values)}. Chart may be incomplete.")
+    st.plotly_chart(bar_figure(tuple(all_brands), tuple(sov_values), "Share of Voice (SOV)", "Brand", "Share of Voice (%)"), use_container_width=True)
+    
+    theme_ratio = kpis.get("theme_ratio", {})
+    if theme_ratio:
+        theme_items = sorted(theme_ratio.items(), key=lambda kv: -kv[1])
+        st.plotly_chart(bar_figure(tuple(theme for theme, _ in theme_items), tuple(pct for _, pct in theme_items), "Top Mention Themes", "Theme", "Percent"), use_container_width=True)
+    else: st.write("No theme data.")
+
+    st.subheader("Detailed Mentions")
+    st.markdown("**Top Keywords & Phrases**")
+    top_keywords = st.session_state.top_keywords
+    if top_keywords: st.dataframe(pd.DataFrame(top_keywords, columns=['Keyword/Phrase', 'Frequency']), use_container_width=True)
+    else: st.write("- No keywords/phrases.")
+
+    st.markdown("**Recent Mentions (All Brands)**")
+    if not st.session_state.recent_mentions.empty:
+        st.dataframe(st.session_state.recent_mentions, column_config={"Link": st.column_config.LinkColumn("Link", display_text="Source Link")}, use_container_width=True, hide_index=True)
+    else: st.write("No mentions.")
+
+    render_report_section(brand, competitors, time_range_text)
+
 
 def main():
     """ Main function to run the Streamlit app. """
+    st.markdown(build_css(), unsafe_allow_html=True)
     # --- Page Config is now at the top ---
     
     if not st.session_state.get('logged_in', False):
@@ -307,44 +415,32 @@ def main():
     # --- END NEW: Title with Logo ---
 
     # Init State
-    if 'full_data' not in st.session_state: st.session_state.full_data = []
+    if 'full_data' not in st.session_state: st.session_state.full_data = pd.DataFrame()
+    if 'recent_mentions' not in st.session_state: st.session_state.recent_mentions = pd.DataFrame()
     if 'kpis' not in st.session_state: st.session_state.kpis = {}
     if 'top_keywords' not in st.session_state: st.session_state.top_keywords = []
     if 'report_generated' not in st.session_state: st.session_state.report_generated = False
-    if 'pdf_report_bytes' not in st.session_state: st.session_state.pdf_report_bytes = None
-    if 'excel_report_bytes' not in st.session_state: st.session_state.excel_report_bytes = None
+    if 'pdf_report_path' not in st.session_state: st.session_state.pdf_report_path = None
+    if 'excel_report_path' not in st.session_state: st.session_state.excel_report_path = None
     if 'ai_summary_text' not in st.session_state: st.session_state.ai_summary_text = ""
 
-    # --- KPI Threshold Inputs ---
+    # --- Sidebar ---
     with st.sidebar:
         st.image("fn logo.jpeg", width=100) # Logo at top of sidebar
         
         st.header("⚙️ Settings")
-        st.subheader("KPI Thresholds (Good ≥)")
-        # --- UPDATED DEFAULTS ---
-        mis_thresh = st.number_input("Media Impact Score (MIS)", min_value=0, value=100, step=10, key="mis_thresh_input")
-        mpi_thresh = st.number_input("Message Penetration (%)", min_value=0, max_value=100, value=30, step=5, key="mpi_thresh_input")
-        eng_thresh = st.number_input("Avg. Social Engagement", min_value=0.0, value=1000.0, step=10.0, format="%.1f", key="eng_thresh_input")
-        reach_thresh = st.number_input("Total Reach", min_value=0, value=10000000, step=10000, key="reach_thresh_input")
-        # --- END UPDATED DEFAULTS ---
-        
-        thresholds = {
-            "mis_good": mis_thresh, "mpi_good": mpi_thresh,
-            "eng_good": eng_thresh, "reach_good": reach_thresh
-        }
-        
         st.divider()
         # --- NEW: Logout Button ---
         if st.button("Logout", use_container_width=True, key="logout_button"):
             st.session_state["logged_in"] = False
             st.session_state["username"] = ""
             # Clear all session data on logout
-            st.session_state.full_data = []
+            st.session_state.full_data = pd.DataFrame()
+            st.session_state.recent_mentions = pd.DataFrame()
             st.session_state.kpis = {}
             st.session_state.top_keywords = []
             st.session_state.report_generated = False
-            st.session_state.pdf_report_bytes = None
-            st.session_state.excel_report_bytes = None
+            discard_report_files()
             st.session_state.ai_summary_text = ""
             st.rerun() # Rerun to force redirect to login page
         # --- END NEW: Logout Button ---
@@ -370,13 +466,13 @@ def main():
 
     # Run Button
     if st.button("Run Analysis", type="primary", use_container_width=True, key="run_analysis_button"):
-        st.session_state.full_data = []; st.session_state.kpis = {}; st.session_state.top_keywords = []
-        st.session_state.report_generated = False; st.session_state.pdf_report_bytes = None
-        st.session_state.excel_report_bytes = None; st.session_state.ai_summary_text = ""
+        st.session_state.full_data = pd.DataFrame(); st.session_state.recent_mentions = pd.DataFrame(); st.session_state.kpis = {}; st.session_state.top_keywords = []
+        st.session_state.report_generated = False; discard_report_files()
+        st.session_state.ai_summary_text = ""
         run_analysis_from_demo(brand, competitors, campaign_messages)
 
     # Display Results
-    display_dashboard(brand, competitors, time_range_text, thresholds)
+    display_dashboard(brand, competitors, time_range_text)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,20 +1,22 @@
-import io
+import math
+import re
 import textwrap
-from datetime import datetime
-from reportlab.lib.pagesizes import letter, A4
+from functools import lru_cache
+from datetime import datetime, timezone
+from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import Paragraph, Table, TableStyle
-from reportlab.lib.colors import navy, black, gray, white, HexColor
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+from reportlab.lib.colors import black, gray, white, HexColor
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.graphics import renderPDF
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.doughnut import Doughnut
+from reportlab.graphics.charts.barcharts import HorizontalBarChart
 import pandas as pd
-from collections import Counter
+from dateutil import parser as dateparser
+from itertools import accumulate, zip_longest
+from bisect import bisect_right
 import os
+import time
 
 # Import your demo loader
 try:
@@ -31,92 +33,192 @@ NAVY = HexColor('#003366')
 LIGHT_GRAY = HexColor('#F8F9FA')
 FOOTER_BG = HexColor('#2C2C2C')
 
-def draw_watermark(c, width, height, logo_path="fn text.jpeg"):
+# Mentions listed per coverage section in the PDF
+MENTIONS_PER_SECTION = 8
+
+# Sentiment badge colors in the mentions sections
+_BADGE_COLORS = {
+    'positive': HexColor('#28a745'),
+    'negative': HexColor('#dc3545'),
+    'anger': HexColor('#8b0000'),
+    'appreciation': HexColor('#007bff'),
+    'neutral': gray,
+    'mixed': HexColor('#ffc107')
+}
+
+# Sentiment doughnut slices in drawing order: (tone, label, color)
+_PIE_TONES = [
+    ('positive', 'Positive', '#28a745'), ('appreciation', 'Appreciation', '#007bff'),
+    ('neutral', 'Neutral', '#6c757d'), ('mixed', 'Mixed', '#ffc107'),
+    ('negative', 'Negative', '#dc3545'), ('anger', 'Anger', '#8b0000'),
+]
+
+# Cover page footer note, pre-wrapped with each line's width for centering
+_COVER_FOOTER_LINES = tuple(
+    (line, stringWidth(line, "Helvetica-Oblique", 8))
+    for line in textwrap.wrap("This report provides AI-powered insights into brand reputation, competitive positioning, and media performance.", width=95)
+)
+
+@lru_cache(maxsize=128)
+def _hex(code):
+    """Shared Color for a hex literal, parsed once instead of on every draw"""
+    return HexColor(code)
+
+@lru_cache(maxsize=4096)
+def _text_width(text, font, size):
+    """Cached glyph width of a string (words, source names, badge labels)"""
+    return stringWidth(text, font, size)
+
+@lru_cache(maxsize=1024)
+def _wrap_to_width(text, font, size, max_width):
+    """Greedy word wrap by measured glyph width rather than character count"""
+    space = _text_width(' ', font, size)
+    lines, current, current_width = [], [], 0.0
+    for word in text.split():
+        word_width = _text_width(word, font, size)
+        if current and current_width + space + word_width > max_width:
+            lines.append(' '.join(current))
+            current, current_width = [], 0.0
+        # A single word wider than the line is split across lines, as textwrap would.
+        # Each piece is the longest prefix that fits, bisected over the cumulative
+        # glyph widths, but at least one character, so even a line narrower than
+        # one glyph makes progress
+        if word_width > max_width and not current and len(word) > 1:
+            prefix_widths = list(accumulate(_text_width(ch, font, size) for ch in word))
+            start, used = 0, 0.0
+            while prefix_widths[-1] - used > max_width and len(word) - start > 1:
+                cut = max(bisect_right(prefix_widths, used + max_width, start), start + 1)
+                lines.append(word[start:cut])
+                start, used = cut, prefix_widths[cut - 1]
+            word = word[start:]
+            word_width = _text_width(word, font, size)
+        current_width += (space if current else 0) + word_width
+        current.append(word)
+    if current:
+        lines.append(' '.join(current))
+    return tuple(lines)
+
+@lru_cache(maxsize=8)
+def _asset_exists(path):
+    """Whether a bundled logo file is present, checked once per process rather than once per page"""
+    return os.path.exists(path)
+
+def draw_watermark(c, width, height, logo_path="static/fn_text.jpeg"):
     """Draw a subtle watermark in the center of the page"""
-    try:
-        if os.path.exists(logo_path):
-            # Calculate center position
-            watermark_width = width * 0.5
-            watermark_height = height * 0.4
-            x = (width - watermark_width) / 2
-            y = (height - watermark_height) / 2
-            
-            # Draw with very low opacity
-            c.saveState()
-            c.setFillAlpha(0.03)  # Very subtle watermark
-            c.drawImage(logo_path, x, y, 
-                       width=watermark_width, 
-                       height=watermark_height,
-                       preserveAspectRatio=True,
-                       mask='auto')
-            c.restoreState()
-    except Exception as e:
-        print(f"Could not load watermark: {e}")
+    # The image placement is recorded once per document as a form XObject.
+    # The opacity is set on the page around it: forms carry no ExtGState
+    # resources of their own, and the form inherits the page's alpha
+    if not c.hasForm("watermark"):
+        c.beginForm("watermark")
+        try:
+            if _asset_exists(logo_path):
+                # Calculate center position
+                watermark_width = width * 0.5
+                watermark_height = height * 0.4
+                x = (width - watermark_width) / 2
+                y = (height - watermark_height) / 2
+                
+                c.drawImage(logo_path, x, y, 
+                           width=watermark_width, 
+                           height=watermark_height,
+                           preserveAspectRatio=True,
+                           mask='auto')
+        except Exception as e:
+            print(f"Could not load watermark: {e}")
+        c.endForm()
+    
+    # Draw with very low opacity
+    c.saveState()
+    c.setFillAlpha(0.03)  # Very subtle watermark
+    c.doForm("watermark")
+    c.restoreState()
 
 def draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on, logo_path="fn logo.jpeg"):
     """Draw professional header and footer with logo and colored background"""
     margin_x = 50
     
-    # --- HEADER SECTION ---
-    # Gold line at top
-    c.setStrokeColor(GOLD)
-    c.setLineWidth(3)
-    c.line(0, height - 35, width, height - 35)
-    
-    # Try to add logo in header (top left)
-    try:
-        if os.path.exists(logo_path):
-            logo_size = 25
-            c.drawImage(logo_path, margin_x, height - 32, 
-                       width=logo_size, height=logo_size,
-                       preserveAspectRatio=True, mask='auto')
-            text_start_x = margin_x + logo_size + 10
-        else:
+    # Everything but the page number is identical on every page, so it is
+    # recorded once per document as a form XObject and referenced after that
+    if not c.hasForm("page_chrome"):
+        c.beginForm("page_chrome")
+        
+        # --- HEADER SECTION ---
+        # Gold line at top
+        c.setStrokeColor(GOLD)
+        c.setLineWidth(3)
+        c.line(0, height - 35, width, height - 35)
+        
+        # Try to add logo in header (top left)
+        try:
+            if _asset_exists(logo_path):
+                logo_size = 25
+                c.drawImage(logo_path, margin_x, height - 32, 
+                           width=logo_size, height=logo_size,
+                           preserveAspectRatio=True, mask='auto')
+                text_start_x = margin_x + logo_size + 10
+            else:
+                text_start_x = margin_x
+        except Exception as e:
+            print(f"Could not load logo: {e}")
             text_start_x = margin_x
-    except Exception as e:
-        print(f"Could not load logo: {e}")
-        text_start_x = margin_x
-    
-    # Brand name in header
-    c.setFont("Helvetica-Bold", 10)
-    c.setFillColor(NAVY)
-    c.drawString(text_start_x, height - 20, f"Flash Narrative Report: {brand}")
-    
-    # Date in header (right aligned)
-    c.setFont("Helvetica", 8)
-    c.setFillColor(gray)
-    date_text = f"Generated: {generated_on}"
-    date_width = c.stringWidth(date_text, "Helvetica", 8)
-    c.drawString(width - margin_x - date_width, height - 20, date_text)
-    
-    # --- FOOTER SECTION ---
-    # Dark background for footer
-    c.setFillColor(FOOTER_BG)
-    c.rect(0, 0, width, 50, fill=1, stroke=0)
-    
-    # Gold line at top of footer
-    c.setStrokeColor(GOLD)
-    c.setLineWidth(2)
-    c.line(0, 50, width, 50)
+        
+        # Brand name in header
+        c.setFont("Helvetica-Bold", 10)
+        c.setFillColor(NAVY)
+        c.drawString(text_start_x, height - 20, f"Flash Narrative Report: {brand}")
+        
+        # Date in header (right aligned)
+        c.setFont("Helvetica", 8)
+        c.setFillColor(gray)
+        date_text = f"Generated: {generated_on}"
+        date_width = c.stringWidth(date_text, "Helvetica", 8)
+        c.drawString(width - margin_x - date_width, height - 20, date_text)
+        
+        # --- FOOTER SECTION ---
+        # Dark background for footer
+        c.setFillColor(FOOTER_BG)
+        c.rect(0, 0, width, 50, fill=1, stroke=0)
+        
+        # Gold line at top of footer
+        c.setStrokeColor(GOLD)
+        c.setLineWidth(2)
+        c.line(0, 50, width, 50)
+        
+        # Confidential notice (left) - in beige
+        c.setFont("Helvetica-Oblique", 8)
+        c.setFillColor(BEIGE)
+        c.drawString(margin_x, 28, "Confidential - Internal Use Only")
+        
+        # Powered by Flash Narrative (right)
+        c.setFont("Helvetica", 7)
+        c.setFillColor(BEIGE)
+        powered_text = "Powered by Flash Narrative AI"
+        powered_width = c.stringWidth(powered_text, "Helvetica", 7)
+        c.drawString(width - margin_x - powered_width, 28, powered_text)
+        
+        c.endForm()
+    c.doForm("page_chrome")
     
-    # Page number (center) - in white for contrast
+    # Page number (center). Without a page count yet, the label is a forward
+    # reference to a form that draw_page_number fills in before the PDF is saved
+    if total_pages is None:
+        c.doForm(f"page_number_{page_num}")
+    else:
+        _draw_page_number(c, width, page_num, total_pages)
+
+def _draw_page_number(c, width, page_num, total_pages):
+    """Page number (center) - in gold for contrast"""
     c.setFont("Helvetica-Bold", 9)
     c.setFillColor(GOLD)
     page_text = f"Page {page_num} of {total_pages}"
     page_width = c.stringWidth(page_text, "Helvetica-Bold", 9)
     c.drawString((width - page_width) / 2, 28, page_text)
-    
-    # Confidential notice (left) - in beige
-    c.setFont("Helvetica-Oblique", 8)
-    c.setFillColor(BEIGE)
-    c.drawString(margin_x, 28, "Confidential - Internal Use Only")
-    
-    # Powered by Flash Narrative (right)
-    c.setFont("Helvetica", 7)
-    c.setFillColor(BEIGE)
-    powered_text = "Powered by Flash Narrative AI"
-    powered_width = c.stringWidth(powered_text, "Helvetica", 7)
-    c.drawString(width - margin_x - powered_width, 28, powered_text)
+
+def draw_page_number(c, width, page_num, total_pages):
+    """Define the page number form a header/footer drew with total_pages=None"""
+    c.beginForm(f"page_number_{page_num}")
+    _draw_page_number(c, width, page_num, total_pages)
+    c.endForm()
 
 def draw_cover_page(c, width, height, brand, timeframe, generated_on, kpis, logo_path="fn full.jpeg"):
     """Draw an executive cover page with logo and watermark"""
@@ -128,7 +230,7 @@ def draw_cover_page(c, width, height, brand, timeframe, generated_on, kpis, logo
     # Try to add full logo at top
     y = height - 100
     try:
-        if os.path.exists(logo_path):
+        if _asset_exists(logo_path):
             logo_width = 200
             logo_height = 80
             logo_x = (width - logo_width) / 2
@@ -188,7 +290,7 @@ def draw_cover_page(c, width, height, brand, timeframe, generated_on, kpis, logo
     box_width = width - 2 * margin_x
     
     # Shadow effect
-    c.setFillColor(HexColor('#CCCCCC'))
+    c.setFillColor(_hex('#CCCCCC'))
     c.roundRect(margin_x + 3, box_y - 3, box_width, box_height, 12, fill=1, stroke=0)
     
     # Main box background
@@ -215,9 +317,9 @@ def draw_cover_page(c, width, height, brand, timeframe, generated_on, kpis, logo
     
     kpi_data = [
         ("Media Impact Score", f"{kpis.get('mis', 0):.0f}", GOLD),
-        ("Message Penetration", f"{kpis.get('mpi', 0):.1f}%", HexColor('#4A90E2')),
-        ("Avg. Engagement", f"{kpis.get('engagement_rate', 0):.1f}", HexColor('#28a745')),
-        ("Total Reach", f"{kpis.get('reach', 0):,}", HexColor('#E74C3C'))
+        ("Message Penetration", f"{kpis.get('mpi', 0):.1f}%", _hex('#4A90E2')),
+        ("Avg. Engagement", f"{kpis.get('engagement_rate', 0):.1f}", _hex('#28a745')),
+        ("Total Reach", f"{kpis.get('reach', 0):,}", _hex('#E74C3C'))
     ]
     
     col_width = (box_width - 60) / 2
@@ -252,103 +354,204 @@ def draw_cover_page(c, width, height, brand, timeframe, generated_on, kpis, logo
     y = box_y + 25
     c.setFont("Helvetica-Oblique", 8)
     c.setFillColor(gray)
-    footer_text = "This report provides AI-powered insights into brand reputation, competitive positioning, and media performance."
-    footer_lines = textwrap.wrap(footer_text, width=95)
-    for i, line in enumerate(footer_lines):
-        line_width = c.stringWidth(line, "Helvetica-Oblique", 8)
-        c.drawString((width - line_width) / 2, y - (i * 12), line)
+    # Centered lines share one text object, each placed at its own origin
+    text = c.beginText()
+    for i, (line, line_width) in enumerate(_COVER_FOOTER_LINES):
+        text.setTextOrigin((width - line_width) / 2, y - (i * 12))
+        text.textOut(line)
+    c.drawText(text)
 
-def create_enhanced_sentiment_pie(sentiment_ratio):
-    """Creates a professional doughnut chart with better styling"""
+# Markdown heading level -> font size in the summary section
+_MD_HEADING_RE = re.compile(r'(#{1,3}) ')
+_HEADING_SIZES = {1: 14, 2: 12, 3: 11}
+
+@lru_cache(maxsize=8)
+def _parse_ai_summary(ai_summary):
+    """Split the AI summary markdown into drawable blocks, once per distinct summary text"""
+    blocks = []
+    ai_lines = ai_summary.split('\n')
+    i = 0
+    while i < len(ai_lines):
+        r = ai_lines[i].rstrip()
+        
+        if not r:  # Empty lines become vertical space
+            blocks.append(('blank',))
+            i += 1
+            continue
+        
+        # Horizontal rule
+        if r in ['---', '***', '___']:
+            blocks.append(('rule',))
+            i += 1
+            continue
+        
+        # Table detection
+        if r.startswith('|'):
+            table_lines = []
+            while i < len(ai_lines) and ai_lines[i].strip().startswith('|'):
+                table_lines.append(ai_lines[i].strip())
+                i += 1
+            
+            rows = []
+            for line in table_lines:
+                if '---' in line and all('-' in cell or '|' in cell for cell in line.split('|')):
+                    continue
+                rows.append(tuple(cell.strip().replace('**', '').strip() for cell in line.strip('|').split('|')))
+            
+            if rows:
+                blocks.append(('table', tuple(rows)))
+            continue
+        
+        # Header detection
+        font_size = 10
+        font = "Helvetica"
+        heading = _MD_HEADING_RE.match(r)
+        is_header = heading is not None
+        if is_header:
+            font = "Helvetica-Bold"
+            font_size = _HEADING_SIZES[len(heading.group(1))]
+            r = r[heading.end():].strip()
+        
+        # Bold text
+        if r.startswith('**') and r.endswith('**'):
+            r = r[2:-2].strip()
+            font = "Helvetica-Bold"
+        
+        # Bullets
+        is_bullet = r.startswith('* ') or r.startswith('- ')
+        if is_bullet:
+            r = r[2:].strip()
+            if r.startswith('**') and r.endswith('**'):
+                r = r[2:-2].strip()
+                font = "Helvetica-Bold"
+        
+        blocks.append(('text', r, font, font_size, is_header, is_bullet))
+        i += 1
+    return tuple(blocks)
+
+def create_enhanced_sentiment_pie(sentiment_ratio, size=250):
+    """Creates the sentiment doughnut as a vector Drawing (size x size points)"""
     labels, sizes, colors = [], [], []
-    color_map = {
-        'positive': '#28a745', 'appreciation': '#007bff', 'neutral': '#6c757d',
-        'mixed': '#ffc107', 'negative': '#dc3545', 'anger': '#8b0000'
-    }
-    sentiment_order = ['positive', 'appreciation', 'neutral', 'mixed', 'negative', 'anger']
-    
-    for tone in sentiment_order:
+    for tone, label, color in _PIE_TONES:
         val = float(sentiment_ratio.get(tone, 0))
         if val > 0.1:
-            labels.append(f"{tone.capitalize()}\n{val:.1f}%")
+            labels.append((label, f"{val:.1f}%"))
             sizes.append(val)
-            colors.append(color_map.get(tone, 'grey'))
+            colors.append(color)
     
     if not sizes:
-        labels = ['Neutral\n100.0%']
+        labels = [('Neutral', '100.0%')]
         sizes = [100.0]
         colors = ['#6c757d']
     
-    # Create figure with better styling
-    fig, ax = plt.subplots(figsize=(5, 5), facecolor='white')
-    
-    # Create doughnut with explode effect for largest segment
-    explode = [0.05 if s == max(sizes) else 0 for s in sizes]
-    
-    wedges, texts, autotexts = ax.pie(
-        sizes,
-        labels=labels,
-        colors=colors,
-        autopct='',
-        startangle=90,
-        pctdistance=0.85,
-        explode=explode,
-        wedgeprops=dict(width=0.4, edgecolor='white', linewidth=2),
-        textprops=dict(size=9, weight='bold')
-    )
-    
-    ax.axis('equal')
-    plt.title('Sentiment Distribution', fontsize=12, fontweight='bold', pad=20, color='#003366')
-    
-    # Save with transparent background
-    buf = io.BytesIO()
-    plt.tight_layout()
-    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight', facecolor='white')
-    plt.close(fig)
-    buf.seek(0)
-    return buf
+    drawing = Drawing(size, size)
+    drawing.add(String(size / 2, size - 16, 'Sentiment Distribution', fontName='Helvetica-Bold', fontSize=12, fillColor=NAVY, textAnchor='middle'))
+    
+    # Doughnut, counter-clockwise from 12 o'clock, largest segment popped out
+    radius = size * 0.25
+    cx, cy = size / 2, size / 2 - 10
+    ring = Doughnut()
+    ring.x, ring.y = cx - radius, cy - radius
+    ring.width = ring.height = 2 * radius
+    ring.data = sizes
+    ring.labels = None
+    ring.startAngle = 90
+    ring.direction = 'anticlockwise'
+    ring.innerRadiusFraction = 0.6
+    ring.slices.strokeColor = white
+    ring.slices.strokeWidth = 2
+    largest = max(sizes)
+    for i, color in enumerate(colors):
+        ring.slices[i].fillColor = _hex(color)
+        if sizes[i] == largest:
+            ring.slices[i].popout = 4
+    drawing.add(ring)
+    
+    # Two-line labels just outside each segment, aligned away from the ring
+    total = sum(sizes)
+    angle = 90.0
+    for (label, pct), val in zip(labels, sizes):
+        sweep = 360.0 * val / total
+        mid = math.radians(angle + sweep / 2)
+        angle += sweep
+        lx = cx + radius * 1.2 * math.cos(mid)
+        ly = cy + radius * 1.2 * math.sin(mid)
+        anchor = 'start' if math.cos(mid) >= -0.01 else 'end'
+        drawing.add(String(lx, ly + 1, label, fontName='Helvetica-Bold', fontSize=9, textAnchor=anchor))
+        drawing.add(String(lx, ly - 9, pct, fontName='Helvetica-Bold', fontSize=9, textAnchor=anchor))
+    return drawing
 
-def create_enhanced_sov_chart(all_brands, sov_values):
-    """Creates a professional horizontal bar chart with better styling"""
-    if not all_brands or not sov_values:
+def create_enhanced_sov_chart(all_brands, sov_values, width=300, height=200):
+    """Creates the share-of-voice horizontal bar chart as a vector Drawing"""
+    # Nothing to compare with fewer than two brands or no mentions at all
+    if len(all_brands) < 2 or not sov_values or sum(sov_values) <= 0:
         return None
     
     try:
-        # Create DataFrame and sort
-        df = pd.DataFrame({'Brand': all_brands, 'SOV': sov_values}).sort_values(by='SOV', ascending=True)
+        # Smallest share at the bottom, top brand(s) highlighted in gold
+        ranked = sorted(zip(sov_values, all_brands))
+        top_share = max(sov_values)
         
-        # Create figure
-        fig, ax = plt.subplots(figsize=(7, max(3, len(all_brands) * 0.6)), facecolor='white')
+        drawing = Drawing(width, height)
+        drawing.add(String(width / 2, height - 14, 'Competitive Share of Voice Analysis', fontName='Helvetica-Bold', fontSize=11, fillColor=NAVY, textAnchor='middle'))
+        drawing.add(String(width / 2, 4, 'Share of Voice (%)', fontName='Helvetica-Bold', fontSize=8, textAnchor='middle'))
         
-        # Create bars with gradient effect (highlight top brand)
-        colors = ['#FFD700' if sov == max(sov_values) else '#4A90E2' for sov in df['SOV']]
-        bars = ax.barh(df['Brand'], df['SOV'], color=colors, edgecolor='gray', linewidth=0.5)
-        
-        # Add value labels
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.5, bar.get_y() + bar.get_height()/2,
-                   f'{width:.1f}%', va='center', ha='left', fontsize=10, fontweight='bold')
-        
-        # Styling
-        ax.set_xlabel('Share of Voice (%)', fontsize=10, fontweight='bold')
-        ax.set_title('Competitive Share of Voice Analysis', fontsize=12, fontweight='bold', pad=15, color='#003366')
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.grid(axis='x', alpha=0.3, linestyle='--')
-        
-        plt.tight_layout()
-        
-        # Save
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png', dpi=150, bbox_inches='tight', facecolor='white')
-        plt.close(fig)
-        buf.seek(0)
-        return buf
+        chart = HorizontalBarChart()
+        chart.x = max(_text_width(str(b), "Helvetica", 8) for _, b in ranked) + 8
+        chart.y = 28
+        chart.width = width - chart.x - 40  # room for the value labels
+        chart.height = height - chart.y - 26
+        chart.data = [[share for share, _ in ranked]]
+        chart.categoryAxis.categoryNames = [str(b) for _, b in ranked]
+        chart.categoryAxis.labels.fontName = 'Helvetica'
+        chart.categoryAxis.labels.fontSize = 8
+        chart.categoryAxis.labels.boxAnchor = 'e'
+        chart.valueAxis.valueMin = 0
+        chart.valueAxis.labels.fontName = 'Helvetica'
+        chart.valueAxis.labels.fontSize = 7
+        chart.valueAxis.visibleGrid = 1
+        chart.valueAxis.gridStrokeColor = _hex('#D9D9D9')
+        chart.valueAxis.gridStrokeDashArray = (3, 3)
+        chart.bars.strokeColor = gray
+        chart.bars.strokeWidth = 0.5
+        for i, (share, _) in enumerate(ranked):
+            chart.bars[(0, i)].fillColor = GOLD if share == top_share else _hex('#4A90E2')
+        chart.barLabelFormat = '%.1f%%'
+        chart.barLabels.fontName = 'Helvetica-Bold'
+        chart.barLabels.fontSize = 8
+        chart.barLabels.boxAnchor = 'w'
+        chart.barLabels.dx = 3
+        drawing.add(chart)
+        return drawing
     except Exception as e:
         print(f"Error creating SOV chart: {e}")
         return None
 
+def _truncate(text, limit=500):
+    """Text cut to limit characters with an ellipsis; shorter text is returned as is"""
+    if len(text) <= limit:
+        return text
+    return text[:limit] + "..."
+
+# (epoch second, formatted timestamp) of the last report
+_TIMESTAMP_CACHE = [None, ""]
+
+def _generated_on():
+    """UTC report timestamp, formatted at most once per second"""
+    now = int(time.time())
+    if _TIMESTAMP_CACHE[0] != now:
+        _TIMESTAMP_CACHE[:] = [now, datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")]
+    return _TIMESTAMP_CACHE[1]
+
+def _draw_lines(c, x, y, lines, leading):
+    """Draws consecutive lines in one text object (a single BT/ET block); returns the y below them"""
+    text = c.beginText(x, y)
+    text.setLeading(leading)
+    for line in lines:
+        text.textLine(line)
+    c.drawText(text)
+    return y - leading * len(lines)
+
 def draw_kpi_boxes(c, y, margin_x, kpis, width):
     """Draw colorful KPI boxes for visual appeal"""
     box_width = (width - 2 * margin_x - 30) / 3
@@ -356,15 +559,15 @@ def draw_kpi_boxes(c, y, margin_x, kpis, width):
     
     kpi_items = [
         ("MIS", f"{kpis.get('mis', 0):.0f}", GOLD),
-        ("MPI", f"{kpis.get('mpi', 0):.1f}%", HexColor('#4A90E2')),
-        ("Reach", f"{kpis.get('reach', 0):,}", HexColor('#28a745'))
+        ("MPI", f"{kpis.get('mpi', 0):.1f}%", _hex('#4A90E2')),
+        ("Reach", f"{kpis.get('reach', 0):,}", _hex('#28a745'))
     ]
     
     for i, (label, value, color) in enumerate(kpi_items):
         x = margin_x + (i * (box_width + 15))
         
         # Draw box shadow
-        c.setFillColor(HexColor('#E8E8E8'))
+        c.setFillColor(_hex('#E8E8E8'))
         c.roundRect(x + 2, y - box_height - 2, box_width, box_height, 5, fill=1, stroke=0)
         
         # Draw main box
@@ -402,7 +605,15 @@ def draw_section_header(c, y, margin_x, title, width):
     
     return y - 25
 
-def draw_enhanced_mentions(c, y, title, mentions, width, margin_x, height, max_mentions=8):
+@lru_cache(maxsize=2048)
+def _format_mention_date(raw_date):
+    """'Oct 21, 2025' style badge date; mentions share dates, so each string is parsed once"""
+    try:
+        return dateparser.parse(raw_date).strftime("%b %d, %Y")
+    except Exception:
+        return raw_date[:10]
+
+def draw_enhanced_mentions(c, y, title, mentions, width, margin_x, height, max_mentions=MENTIONS_PER_SECTION):
     """Draw mentions with clickable sources, dates, and better visual hierarchy"""
     if y < 150:
         c.showPage()
@@ -424,21 +635,15 @@ def draw_enhanced_mentions(c, y, title, mentions, width, margin_x, height, max_m
         # Try to get date
         date_published = item.get('date', item.get('published', ''))
         if date_published:
-            try:
-                if isinstance(date_published, str):
-                    # Try to parse and format date
-                    from dateutil import parser as dateparser
-                    parsed_date = dateparser.parse(date_published)
-                    date_str = parsed_date.strftime("%b %d, %Y")
-                else:
-                    date_str = str(date_published)
-            except:
-                date_str = str(date_published)[:10]
+            if isinstance(date_published, str):
+                date_str = _format_mention_date(date_published)
+            else:
+                date_str = str(date_published)
         else:
             date_str = ""
         
         # Estimate space needed
-        headline_lines = textwrap.wrap(headline, width=85)
+        headline_lines = _wrap_to_width(headline, "Helvetica-Bold", 10, width - 2 * margin_x)
         needed_space = len(headline_lines) * 14 + 55
         
         if y < needed_space + 80:
@@ -448,15 +653,7 @@ def draw_enhanced_mentions(c, y, title, mentions, width, margin_x, height, max_m
             y = draw_section_header(c, y, margin_x, title + " (continued)", width)
         
         # Sentiment badge (top left)
-        sentiment_colors = {
-            'positive': HexColor('#28a745'),
-            'negative': HexColor('#dc3545'),
-            'anger': HexColor('#8b0000'),
-            'appreciation': HexColor('#007bff'),
-            'neutral': gray,
-            'mixed': HexColor('#ffc107')
-        }
-        badge_color = sentiment_colors.get(sentiment, gray)
+        badge_color = _BADGE_COLORS.get(sentiment, gray)
         
         badge_width = 75
         badge_height = 16
@@ -465,31 +662,36 @@ def draw_enhanced_mentions(c, y, title, mentions, width, margin_x, height, max_m
         c.setFont("Helvetica-Bold", 8)
         c.setFillColor(white)
         badge_text = sentiment.upper()
-        badge_text_width = c.stringWidth(badge_text, "Helvetica-Bold", 8)
+        badge_text_width = _text_width(badge_text, "Helvetica-Bold", 8)
         c.drawString(margin_x + (badge_width - badge_text_width) / 2, y - 11, badge_text)
         
         # Date badge (if available) - next to sentiment
         if date_str:
             date_badge_x = margin_x + badge_width + 5
             date_badge_width = 90
-            c.setFillColor(HexColor('#6c757d'))
+            c.setFillColor(_hex('#6c757d'))
             c.roundRect(date_badge_x, y - badge_height, date_badge_width, badge_height, 3, fill=1, stroke=0)
             c.setFont("Helvetica", 7)
             c.setFillColor(white)
-            date_text_width = c.stringWidth(date_str, "Helvetica", 7)
+            date_text_width = _text_width(date_str, "Helvetica", 7)
             c.drawString(date_badge_x + (date_badge_width - date_text_width) / 2, y - 10, date_str)
         
         # Headline
         y -= 32
         c.setFont("Helvetica-Bold", 10)
         c.setFillColor(black)
-        for line in headline_lines:
+        remaining = headline_lines
+        while remaining:
             if y < 80:
                 c.showPage()
                 draw_watermark(c, width, height)
                 y = height - 80
-            c.drawString(margin_x, y, line)
-            y -= 13
+                # A new page starts from the default text state
+                c.setFont("Helvetica-Bold", 10)
+                c.setFillColor(black)
+            fit = int((y - 80) // 13) + 1  # lines that stay above the bottom margin
+            y = _draw_lines(c, margin_x, y, remaining[:fit], 13)
+            remaining = remaining[fit:]
         
         # Source with clickable link
         y -= 5
@@ -499,17 +701,16 @@ def draw_enhanced_mentions(c, y, title, mentions, width, margin_x, height, max_m
         c.drawString(margin_x, y, source_label)
         
         # Make source name clickable if link exists
-        source_x = margin_x + c.stringWidth(source_label, "Helvetica", 8)
+        source_x = margin_x + _text_width(source_label, "Helvetica", 8)
         
         if link and str(link).strip() and str(link).startswith('http'):
             # Clickable link
-            c.setFillColor(HexColor('#007bff'))
-            c.setFont("Helvetica", 8)
+            c.setFillColor(_hex('#007bff'))
             c.drawString(source_x, y, source)
             
             # Underline
-            source_width = c.stringWidth(source, "Helvetica", 8)
-            c.setStrokeColor(HexColor('#007bff'))
+            source_width = _text_width(source, "Helvetica", 8)
+            c.setStrokeColor(_hex('#007bff'))
             c.setLineWidth(0.5)
             c.line(source_x, y - 1, source_x + source_width, y - 1)
             
@@ -542,8 +743,19 @@ def draw_enhanced_mentions(c, y, title, mentions, width, margin_x, height, max_m
     
     return y
 
-def draw_styled_table(c, y, margin_x, width, data, col_widths=None):
-    """Draw a professionally styled table with alternating row colors"""
+def _draw_row(c, x, y, cells, col_widths):
+    """Draws one table row's cells in a single text object, one column width apart"""
+    text = c.beginText(x, y)
+    for i, cell in enumerate(cells[:len(col_widths)]):
+        if i:
+            text.moveCursor(col_widths[i - 1], 0)  # relative to the previous cell's start
+        text.textOut(cell)
+    c.drawText(text)
+
+def draw_styled_table(c, y, margin_x, width, data, col_widths=None, new_page=None):
+    """Draw a professionally styled table with alternating row colors.
+    With a new_page callback (returning the next page's top y), rows that would
+    run into the footer continue on a new page under a repeated header row."""
     if not data or len(data) < 2:
         return y
     
@@ -552,36 +764,39 @@ def draw_styled_table(c, y, margin_x, width, data, col_widths=None):
         col_widths = [(width - 2 * margin_x) / num_cols] * num_cols
     
     row_height = 25
+    table_width = sum(col_widths)
+    header = [str(cell) for cell in data[0]]
     
-    # Header row with navy background
-    c.setFillColor(NAVY)
-    c.rect(margin_x, y - row_height, sum(col_widths), row_height, fill=1, stroke=0)
-    
-    c.setFont("Helvetica-Bold", 10)
-    c.setFillColor(white)
-    x_pos = margin_x + 10
-    for i, cell in enumerate(data[0]):
-        c.drawString(x_pos, y - row_height + 8, str(cell))
-        x_pos += col_widths[i]
+    def draw_header(y):
+        # Header row with navy background
+        c.setFillColor(NAVY)
+        c.rect(margin_x, y - row_height, table_width, row_height, fill=1, stroke=0)
+        
+        c.setFont("Helvetica-Bold", 10)
+        c.setFillColor(white)
+        _draw_row(c, margin_x + 10, y - row_height + 8, header, col_widths)
+        
+        # Data rows are drawn in black Helvetica 9
+        c.setFont("Helvetica", 9)
+        c.setFillColor(black)
+        return y - row_height
     
-    y -= row_height
+    y = draw_header(y)
     
     # Data rows with alternating colors
-    c.setFont("Helvetica", 9)
     for row_idx, row in enumerate(data[1:], 1):
+        if new_page is not None and y - row_height < 80:
+            y = draw_header(new_page())
+        
         # Alternating row colors
         if row_idx % 2 == 0:
             c.setFillColor(LIGHT_GRAY)
-            c.rect(margin_x, y - row_height, sum(col_widths), row_height, fill=1, stroke=0)
+            c.rect(margin_x, y - row_height, table_width, row_height, fill=1, stroke=0)
+            c.setFillColor(black)
         
-        c.setFillColor(black)
-        x_pos = margin_x + 10
-        for i, cell in enumerate(row):
-            cell_text = str(cell)
-            if len(cell_text) > 50:  # Wrap long text
-                cell_text = cell_text[:47] + "..."
-            c.drawString(x_pos, y - row_height + 8, cell_text)
-            x_pos += col_widths[i]
+        cells = [str(cell) for cell in row]
+        cells = [text[:47] + "..." if len(text) > 50 else text for text in cells]  # Truncate long text
+        _draw_row(c, margin_x + 10, y - row_height + 8, cells, col_widths)
         
         y -= row_height
     
@@ -592,37 +807,53 @@ def generate_report(kpis, top_keywords, full_articles_data, brand="Brand", compe
     if competitors is None:
         competitors = []
     
-    # Categorize mentions
-    main_brand_mentions = []
-    competitor_mentions = []
-    related_mentions = []
+    # Categorize mentions - only the rows that will be drawn become dicts
+    articles_df = full_articles_data if isinstance(full_articles_data, pd.DataFrame) else pd.DataFrame(full_articles_data)
     
     lower_brand = brand.lower()
     lower_competitors = {c.lower() for c in competitors}
     
-    for item in full_articles_data:
+    # Mentions share a handful of brand combinations, so each distinct one is classified once
+    @lru_cache(maxsize=None)
+    def categorize_key(mentioned):
         mentioned_brands_lower = set()
-        mentioned_str = item.get('mentioned_brands', '')
-        if isinstance(mentioned_str, str):
-            mentioned_brands_lower = {b.strip().lower() for b in mentioned_str.split(',') if b.strip()}
-        elif isinstance(mentioned_str, list):
-            mentioned_brands_lower = {b.strip().lower() for b in mentioned_str}
+        if isinstance(mentioned, str):
+            mentioned_brands_lower = {b.strip().lower() for b in mentioned.split(',') if b.strip()}
+        elif isinstance(mentioned, tuple):
+            mentioned_brands_lower = {b.strip().lower() for b in mentioned}
         
         mentions_main = lower_brand in mentioned_brands_lower
         mentions_comp = any(comp in mentioned_brands_lower for comp in lower_competitors)
         
         if mentions_main and not mentions_comp:
-            main_brand_mentions.append(item)
+            return 'main'
         elif not mentions_main and mentions_comp:
-            competitor_mentions.append(item)
-        else:
-            related_mentions.append(item)
+            return 'competitor'
+        return 'related'
+    
+    def categorize(mentioned):
+        if isinstance(mentioned, list):
+            return categorize_key(tuple(mentioned))
+        return categorize_key(mentioned if isinstance(mentioned, str) else None)
+    
+    if 'mentioned_brands' in articles_df.columns:
+        categories = articles_df['mentioned_brands'].map(categorize)
+    else:
+        categories = pd.Series('related', index=articles_df.index)
+    
+    def section(category):
+        return articles_df[categories == category].head(MENTIONS_PER_SECTION).to_dict('records')
+    
+    main_brand_mentions = section('main')
+    # Without competitors nothing can be categorized as one, so skip that filter
+    competitor_mentions = section('competitor') if lower_competitors else []
+    related_mentions = section('related')
     
     # Get KPI data
     sentiment_ratio = kpis.get('sentiment_ratio', {})
     sov = kpis.get('sov', [])
     all_brands = kpis.get('all_brands', [brand] + competitors)
-    generated_on = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+    generated_on = _generated_on()
     
     if isinstance(timeframe_hours, int):
         time_text = f"Last {timeframe_hours} Hours"
@@ -636,57 +867,59 @@ def generate_report(kpis, top_keywords, full_articles_data, brand="Brand", compe
         ai_summary = f"**AI Summary Error:** {str(e)}\n\nPlease check the demo_ai_summary.txt file encoding."
     
     # Create PDF
-    pdf_buffer = io.BytesIO()
-    c = canvas.Canvas(pdf_buffer, pagesize=letter)
+    c = canvas.Canvas(None, pagesize=letter)
     width, height = letter
     margin_x = 50
     
-    # Estimate total pages
-    total_pages = 15
+    # The page count is only known once everything is laid out, so page
+    # numbers are left as form references and filled in at the end
+    total_pages = None
+    numbered_pages = []
     
     # === PAGE 1: COVER PAGE ===
     draw_cover_page(c, width, height, brand, time_text, generated_on, kpis)
-    c.showPage()
+    page_num = 1
+    
+    def new_page():
+        """Finish the current page and start the next content page below its header"""
+        nonlocal page_num, y
+        c.showPage()
+        page_num = c.getPageNumber()  # mention overflow pages are counted too
+        numbered_pages.append(page_num)
+        draw_watermark(c, width, height)
+        draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
+        y = height - 80
+        return y
     
     # === PAGE 2+: CONTENT PAGES ===
-    page_num = 2
     
     # Performance Dashboard
-    draw_watermark(c, width, height)
-    draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-    y = height - 80
+    new_page()
     y = draw_section_header(c, y, margin_x, "Performance Dashboard", width)
     y = draw_kpi_boxes(c, y, margin_x, kpis, width)
     
     # Sentiment Chart
-    pie_buf = create_enhanced_sentiment_pie(sentiment_ratio)
-    if pie_buf:
+    pie_chart = create_enhanced_sentiment_pie(sentiment_ratio)
+    if pie_chart:
         try:
-            img = ImageReader(pie_buf)
             img_width = 250
             img_height = 250
             img_x = margin_x
             if y < img_height + 80:
-                c.showPage()
-                page_num += 1
-                draw_watermark(c, width, height)
-                draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-                y = height - 80
+                new_page()
             y -= img_height
-            c.drawImage(img, img_x, y, width=img_width, height=img_height, preserveAspectRatio=True, mask='auto')
+            renderPDF.draw(pie_chart, c, img_x, y)
         except Exception as e:
             print(f"Error drawing sentiment chart: {e}")
     
     # SOV Chart (next to sentiment if space)
-    sov_buf = create_enhanced_sov_chart(all_brands, sov)
-    if sov_buf:
+    # Fills the space right of the 250pt sentiment chart
+    img_x = margin_x + 260
+    sov_chart = create_enhanced_sov_chart(all_brands, sov, width=width - margin_x - img_x)
+    if sov_chart:
         try:
-            img_sov = ImageReader(sov_buf)
-            img_width = 300
-            img_height = 200
-            img_x = width - margin_x - img_width
             img_y = y + 25
-            c.drawImage(img_sov, img_x, img_y, width=img_width, height=img_height, preserveAspectRatio=True, mask='auto')
+            renderPDF.draw(sov_chart, c, img_x, img_y)
         except Exception as e:
             print(f"Error drawing SOV chart: {e}")
     
@@ -694,218 +927,129 @@ def generate_report(kpis, top_keywords, full_articles_data, brand="Brand", compe
     
     # === AI SUMMARY SECTION ===
     if y < 200:
-        c.showPage()
-        page_num += 1
-        draw_watermark(c, width, height)
-        draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-        y = height - 80
+        new_page()
     
     y = draw_section_header(c, y, margin_x, "AI-Powered Insights & Recommendations", width)
     
-    # Parse and draw AI summary with improved formatting
-    ai_lines = ai_summary.split('\n')
-    i = 0
-    while i < len(ai_lines):
-        r = ai_lines[i].rstrip()
+    # Draw the AI summary from its pre-parsed blocks. Consecutive text blocks
+    # often share a font and color, so those are only set when they change;
+    # the page number is part of the key because a new page resets them
+    text_state = None
+    for block in _parse_ai_summary(ai_summary):
+        kind = block[0]
         
-        if not r:  # Skip empty lines
+        if kind == 'blank':
             y -= 6
             if y < 80:
-                c.showPage()
-                page_num += 1
-                draw_watermark(c, width, height)
-                draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-                y = height - 80
-            i += 1
+                new_page()
             continue
         
         # Horizontal rule
-        if r in ['---', '***', '___']:
+        if kind == 'rule':
             c.setStrokeColor(GOLD)
             c.setLineWidth(1)
             c.line(margin_x, y - 5, width - margin_x, y - 5)
             y -= 12
             if y < 80:
-                c.showPage()
-                page_num += 1
-                draw_watermark(c, width, height)
-                draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-                y = height - 80
-            i += 1
+                new_page()
             continue
         
-        # Table detection
-        if r.startswith('|'):
-            table_lines = []
-            while i < len(ai_lines) and ai_lines[i].strip().startswith('|'):
-                table_lines.append(ai_lines[i].strip())
-                i += 1
-            i -= 1
+        if kind == 'table':
+            rows = block[1]
+            num_cols = max(len(row) for row in rows)
+            table_width = width - 2 * margin_x
+            cell_width = (table_width - 20) / num_cols
+            text_x = margin_x + 5
+            row_height = 20
             
-            rows = []
-            for line in table_lines:
-                if '---' in line and all('-' in cell or '|' in cell for cell in line.split('|')):
-                    continue
-                cells = [cell.strip() for cell in line.strip('|').split('|')]
-                rows.append(cells)
+            table_height = len(rows) * row_height + 30
+            if y < table_height + 80:
+                new_page()
             
-            if rows:
-                num_cols = max(len(row) for row in rows)
-                cell_width = (width - 2 * margin_x - 20) / num_cols
-                row_height = 20
-                
-                table_height = len(rows) * row_height + 30
-                if y < table_height + 80:
-                    c.showPage()
-                    page_num += 1
-                    draw_watermark(c, width, height)
-                    draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-                    y = height - 80
+            # Header row
+            c.setFont("Helvetica-Bold", 9)
+            c.setFillColor(NAVY)
+            c.rect(margin_x, y - row_height, table_width, row_height, fill=0, stroke=1)
+            for j, cell in enumerate(rows[0]):
+                wrapped = _wrap_to_width(cell, "Helvetica-Bold", 9, cell_width - 10)
+                for k, wline in enumerate(wrapped):
+                    c.drawString(text_x + j * cell_width, y - row_height + 12 - k * 10, wline)
+            y -= row_height
+            
+            # Data rows
+            c.setFont("Helvetica", 8)
+            c.setFillColor(black)
+            for row_idx, row in enumerate(rows[1:], 1):
+                if row_idx % 2 == 0:
+                    c.setFillColor(LIGHT_GRAY)
+                    c.rect(margin_x, y - row_height, table_width, row_height, fill=1, stroke=0)
+                    c.setFillColor(black)
+                else:
+                    c.rect(margin_x, y - row_height, table_width, row_height, fill=0, stroke=1)
                 
-                # Header row
-                c.setFont("Helvetica-Bold", 9)
-                c.setFillColor(NAVY)
-                c.rect(margin_x, y - row_height, width - 2 * margin_x, row_height, fill=0, stroke=1)
-                for j, cell in enumerate(rows[0]):
-                    cell = cell.replace('**', '')
-                    wrapped = textwrap.wrap(cell, width=int(cell_width / 6))
+                for j, cell in enumerate(row):
+                    wrapped = _wrap_to_width(cell, "Helvetica", 8, cell_width - 10)
                     for k, wline in enumerate(wrapped):
-                        c.drawString(margin_x + 5 + j * cell_width, y - row_height + 12 - k * 10, wline)
+                        if y - k * 10 < 80:
+                            new_page()
+                            c.setFont("Helvetica", 8)
+                            c.setFillColor(black)
+                        c.drawString(text_x + j * cell_width, y - row_height + 12 - k * 10, wline)
                 y -= row_height
-                
-                # Data rows
-                c.setFont("Helvetica", 8)
-                c.setFillColor(black)
-                for row_idx, row in enumerate(rows[1:], 1):
-                    if row_idx % 2 == 0:
-                        c.setFillColor(LIGHT_GRAY)
-                        c.rect(margin_x, y - row_height, width - 2 * margin_x, row_height, fill=1, stroke=0)
-                        c.setFillColor(black)
-                    else:
-                        c.rect(margin_x, y - row_height, width - 2 * margin_x, row_height, fill=0, stroke=1)
-                    
-                    for j, cell in enumerate(row):
-                        cell = cell.replace('**', '').strip()
-                        wrapped = textwrap.wrap(cell, width=int(cell_width / 6))
-                        for k, wline in enumerate(wrapped):
-                            if y - k * 10 < 80:
-                                c.showPage()
-                                page_num += 1
-                                draw_watermark(c, width, height)
-                                draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-                                y = height - 80
-                            c.drawString(margin_x + 5 + j * cell_width, y - row_height + 12 - k * 10, wline)
-                    y -= row_height
-                y -= 10
-            i += 1
+            y -= 10
+            text_state = None  # the table changed the font and fill
             continue
         
-        # Header detection
-        font_size = 10
-        font = "Helvetica"
-        is_header = False
-        
-        if r.startswith('### '):
-            font = "Helvetica-Bold"
-            font_size = 11
-            r = r[4:].strip()
-            is_header = True
-            c.setFillColor(NAVY)
-        elif r.startswith('## '):
-            font = "Helvetica-Bold"
-            font_size = 12
-            r = r[3:].strip()
-            is_header = True
-            c.setFillColor(NAVY)
-        elif r.startswith('# '):
-            font = "Helvetica-Bold"
-            font_size = 14
-            r = r[2:].strip()
-            is_header = True
-            c.setFillColor(NAVY)
-        else:
-            c.setFillColor(black)
-        
-        # Bold text
-        if r.startswith('**') and r.endswith('**'):
-            r = r[2:-2].strip()
-            font = "Helvetica-Bold"
-        
-        # Bullets
-        is_bullet = r.startswith('* ') or r.startswith('- ')
-        if is_bullet:
-            r = r[2:].strip()
-            if r.startswith('**') and r.endswith('**'):
-                r = r[2:-2].strip()
-                font = "Helvetica-Bold"
-        
-        c.setFont(font, font_size)
+        _, r, font, font_size, is_header, is_bullet = block
+        state = (font, font_size, is_header, page_num)
+        if state != text_state:
+            c.setFillColor(NAVY if is_header else black)
+            c.setFont(font, font_size)
+            text_state = state
         
         # Wrap and draw
-        wrap_width = 80 if is_bullet else 90
-        lines = textwrap.wrap(r, width=wrap_width)
-        for j, line in enumerate(lines):
+        draw_x = margin_x + (15 if is_bullet else 0)
+        bullet_width = stringWidth("• ", font, font_size) if is_bullet else 0
+        lines = _wrap_to_width(r, font, font_size, width - margin_x - draw_x - bullet_width)
+        if is_bullet and lines:
+            lines = (f"• {lines[0]}",) + lines[1:]
+        leading = 12 + (2 if is_header else 0)
+        while lines:
             if y < 80:
-                c.showPage()
-                page_num += 1
-                draw_watermark(c, width, height)
-                draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-                y = height - 80
+                new_page()
                 c.setFont(font, font_size)
                 if is_header:
                     c.setFillColor(NAVY)
                 else:
                     c.setFillColor(black)
-            
-            draw_x = margin_x + (15 if is_bullet else 0)
-            draw_string = line
-            if is_bullet and j == 0:
-                draw_string = f"• {line}"
-            c.drawString(draw_x, y, draw_string)
-            y -= 12 + (2 if is_header else 0)
+            fit = int((y - 80) // leading) + 1  # lines that stay above the bottom margin
+            y = _draw_lines(c, draw_x, y, lines[:fit], leading)
+            lines = lines[fit:]
         
         if is_header:
             y -= 5
-        
-        i += 1
     
     y -= 15
     
     # === MENTIONS SECTIONS ===
     if y < height / 2:
-        c.showPage()
-        page_num += 1
-        draw_watermark(c, width, height)
-        draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-        y = height - 80
+        new_page()
     
     y = draw_enhanced_mentions(c, y, f"{brand} Media Coverage", main_brand_mentions, width, margin_x, height)
     
     if y < 200:
-        c.showPage()
-        page_num += 1
-        draw_watermark(c, width, height)
-        draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-        y = height - 80
+        new_page()
     
     y = draw_enhanced_mentions(c, y, "Competitive Intelligence", competitor_mentions, width, margin_x, height)
     
     if y < 200:
-        c.showPage()
-        page_num += 1
-        draw_watermark(c, width, height)
-        draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-        y = height - 80
+        new_page()
     
     y = draw_enhanced_mentions(c, y, "Related News & Passive Mentions", related_mentions, width, margin_x, height)
     
     # === KEYWORDS SECTION ===
     if y < 250:
-        c.showPage()
-        page_num += 1
-        draw_watermark(c, width, height)
-        draw_header_footer(c, width, height, brand, page_num, total_pages, generated_on)
-        y = height - 80
+        new_page()
     
     y = draw_section_header(c, y, margin_x, "Trending Keywords & Phrases", width)
     
@@ -914,12 +1058,16 @@ def generate_report(kpis, top_keywords, full_articles_data, brand="Brand", compe
     for word, freq in top_keywords[:20]:
         kw_data.append([word, str(freq)])
     
-    y = draw_styled_table(c, y, margin_x, width, kw_data, col_widths=[400, 112])
+    y = draw_styled_table(c, y, margin_x, width, kw_data, col_widths=[400, 112], new_page=new_page)
     
     # === FINALIZE PDF ===
-    c.save()
-    pdf_bytes = pdf_buffer.getvalue()
-    pdf_buffer.close()
+    total_pages = c.getPageNumber()
+    for n in numbered_pages:
+        draw_page_number(c, width, n, total_pages)
+    
+    # getpdfdata() hands back the finished document directly; save() would write
+    # it into a BytesIO only for getvalue() to copy it out again
+    pdf_bytes = c.getpdfdata()
     
     # === MARKDOWN GENERATION ===
     md_lines = [
@@ -934,37 +1082,32 @@ def generate_report(kpis, top_keywords, full_articles_data, brand="Brand", compe
         f"- **Total Reach:** {kpis.get('reach', 0):,}",
         "",
         "## Sentiment Distribution",
+        *(f"- **{tone.capitalize()}:** {val:.1f}%" for tone, val in sentiment_ratio.items()),
+        "\n## Share of Voice (SOV)",
+        "| Brand | SOV (%) |",
+        "|-------|---------|",
+        # Brands without an SOV value read as 0; kpis['sov'] itself is left untouched
+        *(f"| {b} | {s:.1f} |" for b, s in zip_longest(all_brands, sov[:len(all_brands)], fillvalue=0)),
+        "\n## AI Summary",
+        ai_summary,
     ]
     
-    for tone, val in sentiment_ratio.items():
-        md_lines.append(f"- **{tone.capitalize()}:** {val:.1f}%")
-    
-    md_lines.append("\n## Share of Voice (SOV)")
-    md_lines.append("| Brand | SOV (%) |")
-    md_lines.append("|-------|---------|")
-    
-    if len(sov) < len(all_brands):
-        sov += [0] * (len(all_brands) - len(sov))
-    
-    for b, s in zip(all_brands, sov):
-        md_lines.append(f"| {b} | {s:.1f} |")
-    
-    md_lines.append("\n## AI Summary")
-    md_lines.append(ai_summary)
-    
     md = "\n".join(md_lines)
     
-    # === JSON SUMMARY ===
-    json_summary = {
-        "brand": brand,
-        "competitors": competitors,
-        "kpis": kpis,
-        "top_keywords": top_keywords,
-        "generated_on": generated_on,
-        "ai_summary": ai_summary[:500] + "..." if len(ai_summary) > 500 else ai_summary
-    }
-    
+    # === JSON SUMMARY (only built when asked for) ===
     if include_json:
+        # compute_kpis returns the analyzed mentions as a DataFrame; JSON gets them as records
+        json_kpis = dict(kpis)
+        if isinstance(json_kpis.get('analyzed_data'), pd.DataFrame):
+            json_kpis['analyzed_data'] = json_kpis['analyzed_data'].to_dict('records')
+        json_summary = {
+            "brand": brand,
+            "competitors": competitors,
+            "kpis": json_kpis,
+            "top_keywords": top_keywords,
+            "generated_on": generated_on,
+            "ai_summary": _truncate(ai_summary)
+        }
         return md, pdf_bytes, json_summary
     return md, pdf_bytes
 
@@ -976,6 +1119,9 @@ def render_ai_summary(c, y, margin_x, width, height, ai_summary, brand, page_num
     - page_num_ref is a dict-like mutable container {'page': current_page} so caller can increment it.
     Returns updated y and updated page number inside page_num_ref.
     """
+    # Only this renderer uses platypus, so it is loaded here rather than at import
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import Paragraph
     # Normalize whitespace and line endings
     text = ai_summary.replace('\r\n', '\n').replace('\r', '\n')
     text = text.replace('\t', '    ')
@@ -1021,7 +1167,7 @@ def render_ai_summary(c, y, margin_x, width, height, ai_summary, brand, page_num
                     y = new_page()
                 # Use existing draw_styled_table (it requires a header + rows)
                 try:
-                    y = draw_styled_table(c, y, margin_x, width, rows)
+                    y = draw_styled_table(c, y, margin_x, width, rows, new_page=new_page)
                 except Exception as e:
                     # fallback: draw simple lines
                     for r in rows:
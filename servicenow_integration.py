@@ -2,14 +2,24 @@ from dotenv import load_dotenv
 load_dotenv()  # Loads .env file if present
 
 import os
+import atexit
+import threading
 import requests
 import base64
 from slack_sdk import WebClient
 import smtplib
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+from email.message import EmailMessage
+from functools import lru_cache
+
+# One session for all ServiceNow calls, so repeat tickets reuse the open TLS connection
+_SN_SESSION = requests.Session()
+_SN_SESSION.headers.update({'Content-Type': 'application/json', 'Accept': 'application/json'})
+
+@lru_cache(maxsize=4)
+def _basic_auth(user, password):
+    """ Basic auth header value, encoded once per set of credentials """
+    return "Basic " + base64.b64encode(f"{user}:{password}".encode()).decode()
 
 # ... (create_servicenow_ticket and send_alert functions remain the same) ...
 def create_servicenow_ticket(title, description, urgency='2', impact='2'):
@@ -26,11 +36,10 @@ def create_servicenow_ticket(title, description, urgency='2', impact='2'):
         return
     # ... (rest of try/except block) ...
     try:
-        auth = base64.b64encode(f"{user}:{password}".encode()).decode()
-        headers = { 'Authorization': f'Basic {auth}', 'Content-Type': 'application/json', 'Accept': 'application/json' }
+        headers = { 'Authorization': _basic_auth(user, password) }
         url = f"https://{instance}.service-now.com/api/now/table/incident"
         body = { 'short_description': title, 'description': description, 'urgency': urgency, 'impact': impact }
-        response = requests.post(url, headers=headers, json=body, timeout=10)
+        response = _SN_SESSION.post(url, headers=headers, json=body, timeout=10)
         response.raise_for_status()
         ticket_num = response.json().get('result', {}).get('number', 'UNKNOWN')
         print(f"[ServiceNow Ticket Created] {ticket_num}")
@@ -78,6 +87,65 @@ def send_alert(msg, channel='#alerts', to_email=None):
     if not sent:
         print(f"[Alert Fallback - Print] {msg}")
 
+# --- SMTP CONNECTIONS FOR REPORT EMAILS ---
+# Idle logged-in connections keyed by (server, port, user), so repeated sends
+# skip the handshake + AUTH. A sender checks a connection out and back in; the
+# lock only guards the dict and is never held across network calls.
+_SMTP_POOL = {}
+_SMTP_LOCK = threading.Lock()
+
+def _connect_smtp(smtp_server, smtp_port, smtp_user, smtp_pass):
+    """ Opens and logs in an SMTP connection (SSL on 465, STARTTLS otherwise) """
+    # Use SMTP_SSL (Port 465) instead of SMTP + starttls (Port 587)
+    # This is more robust against local network/firewall blocks.
+    if smtp_port == 465:
+        server = smtplib.SMTP_SSL(smtp_server, smtp_port, timeout=20)
+    else:
+        server = smtplib.SMTP(smtp_server, smtp_port, timeout=20)
+        server.ehlo()
+        server.starttls()
+        server.ehlo()
+    server.login(smtp_user, smtp_pass)
+    return server
+
+def _close_smtp(server):
+    """ QUITs the connection, or just closes the socket if the server is gone """
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
+
+def _checkout_smtp(smtp_server, smtp_port, smtp_user, smtp_pass):
+    """ Takes an idle pooled connection that still answers NOOP, otherwise opens a fresh one """
+    key = (smtp_server, smtp_port, smtp_user)
+    while True:
+        with _SMTP_LOCK:
+            idle = _SMTP_POOL.get(key)
+            server = idle.pop() if idle else None
+        if server is None:
+            return _connect_smtp(smtp_server, smtp_port, smtp_user, smtp_pass)
+        try:
+            if server.noop()[0] == 250:
+                return server
+        except (smtplib.SMTPException, OSError):
+            pass
+        _close_smtp(server)
+
+def _checkin_smtp(smtp_server, smtp_port, smtp_user, server):
+    """ Returns a connection to the pool for the next send """
+    with _SMTP_LOCK:
+        _SMTP_POOL.setdefault((smtp_server, smtp_port, smtp_user), []).append(server)
+
+def close_smtp_pool():
+    """ Closes every pooled SMTP connection (registered to run at exit) """
+    with _SMTP_LOCK:
+        idle = [server for servers in _SMTP_POOL.values() for server in servers]
+        _SMTP_POOL.clear()
+    for server in idle:
+        _close_smtp(server)
+
+atexit.register(close_smtp_pool)
+
 # --- FUNCTION FOR SENDING REPORTS WITH ATTACHMENTS (UPDATED) ---
 def send_report_email_with_attachments(to_email, subject, body, attachments):
     """
@@ -94,35 +162,30 @@ def send_report_email_with_attachments(to_email, subject, body, attachments):
         return False # Indicate failure
 
     try:
-        msg = MIMEMultipart()
+        msg = EmailMessage()
         msg['From'] = smtp_user
         msg['To'] = to_email
         msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
+        msg.set_content(body)
 
+        # add_attachment base64-encodes the bytes in one pass and sets the disposition
         for filename, content_bytes, mime_type in attachments:
             maintype, subtype = mime_type.split('/', 1)
-            part = MIMEBase(maintype, subtype)
-            part.set_payload(content_bytes)
-            encoders.encode_base64(part)
-            part.add_header('Content-Disposition', f"attachment; filename= {filename}")
-            msg.attach(part)
-
-        # --- THIS IS THE FIX ---
-        # Use SMTP_SSL (Port 465) instead of SMTP + starttls (Port 587)
-        # This is more robust against local network/firewall blocks.
-        if smtp_port == 465:
-            server = smtplib.SMTP_SSL(smtp_server, smtp_port, timeout=20)
-        else:
-            server = smtplib.SMTP(smtp_server, smtp_port, timeout=20)
-            server.ehlo()
-            server.starttls()
-            server.ehlo()
-        
-        server.login(smtp_user, smtp_pass)
-        server.send_message(msg)
-        server.quit()
-        # --- END OF FIX ---
+            msg.add_attachment(content_bytes, maintype=maintype, subtype=subtype, filename=filename)
+
+        server = _checkout_smtp(smtp_server, smtp_port, smtp_user, smtp_pass)
+        try:
+            try:
+                server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # Dropped between the NOOP check and the send: reconnect once
+                _close_smtp(server)
+                server = _connect_smtp(smtp_server, smtp_port, smtp_user, smtp_pass)
+                server.send_message(msg)
+        except Exception:
+            _close_smtp(server)
+            raise
+        _checkin_smtp(smtp_server, smtp_port, smtp_user, server)
         
         print(f"[Email Sent] Report with {len(attachments)} attachment(s) sent to {to_email}")
         return True # Indicate success
@@ -131,4 +194,4 @@ def send_report_email_with_attachments(to_email, subject, body, attachments):
          return False
     except Exception as e:
         print(f"[Email Error] Failed to send report: {e}")
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,82 @@
+import contextlib
+import io
+import os
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import analysis
+
+DEMO_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'demo_data.csv')
+
+
+class BrandMatchingTest(unittest.TestCase):
+    """Brand names that contain one another must all be counted, like per-brand searches."""
+
+    def test_brand_inside_competitor_name(self):
+        kpis = analysis.compute_kpis([{'text': 'Zenith Bank posts profit'}], [], 'Zenith Bank', ['Zenith'])
+        self.assertEqual(sorted(kpis['analyzed_data']['mentioned_brands'][0]), ['Zenith', 'Zenith Bank'])
+        self.assertEqual(kpis['sov'], [50.0, 50.0])
+
+    def test_every_overlapping_name_counts(self):
+        kpis = analysis.compute_kpis(
+            [{'text': 'Access Bank grows'}, {'text': 'Bank holiday'}], [], 'Access Bank', ['Access', 'Bank']
+        )
+        self.assertEqual(kpis['analyzed_data']['mentioned_brands'].tolist(), [['Access Bank', 'Access', 'Bank'], ['Bank']])
+        self.assertEqual(kpis['all_brands'], ['Access Bank', 'Access', 'Bank'])
+        self.assertEqual(kpis['sov'], [25.0, 25.0, 50.0])
+
+    def test_whole_words_only(self):
+        kpis = analysis.compute_kpis([{'text': 'Zenithal heights'}], [], 'Zenith', [])
+        self.assertEqual(kpis['analyzed_data']['mentioned_brands'][0], [])
+
+
+def _baseline_theme(text_lower):
+    """The original per-mention theme ladder: substring checks in priority order."""
+    if any(kw in text_lower for kw in ['csr', 'esg', 'donation', 'community', 'foundation', 'initiative', 'sustainability', 'empower', 'scholarship']):
+        return 'CSR/ESG'
+    elif any(kw in text_lower for kw in ['ceo', 'gmd', 'profit', 'results', 'acquisition', 'corporate', 'raise', 'capital', 'bond', 'earnings', 'dividend', 'financials', 'pre-tax', 'pat', 'shareholders']):
+        return 'Corporate'
+    elif any(kw in text_lower for kw in ['partner', 'sponsorship', 'marathon', 'zecathon', 'collaboration', 'champions']):
+        return 'Partnership/Sponsorship'
+    elif any(kw in text_lower for kw in ['app', 'loan', 'card', 'customer service', 'downtime', 'glitch', 'e-channel', 'transfer', 'pos', 'digital', 'feature', 'platform']):
+        return 'Product/Service'
+    elif any(kw in text_lower for kw in ['fraud', 'cbn', 'efcc', 'fine', 'court', 'scam', 'allegation', 'rift', 'lawsuit', 'crisis', 'vulnerability', 'sanction', 'erosion']):
+        return 'Legal/Risk'
+    return 'General News'
+
+
+class ThemeMatchingTest(unittest.TestCase):
+    """Theme keywords match as substrings, as they always have."""
+
+    def test_substring_matches(self):
+        self.assertEqual(analysis.detect_theme('record profits this year'), 'Corporate')
+        self.assertEqual(analysis.detect_theme('new apps and cards'), 'Product/Service')
+        self.assertEqual(analysis.detect_theme('nothing to see'), 'General News')
+
+    def test_demo_theme_ratio_matches_baseline(self):
+        texts = pd.read_csv(DEMO_CSV)['Mention Text'].fillna('').astype(str).tolist()
+        kpis = analysis.compute_kpis([{'text': t} for t in texts], [], 'Zenith', [])
+        expected = pd.Series([_baseline_theme(t.lower()) for t in texts]).value_counts() / len(texts) * 100
+        self.assertEqual(kpis['analyzed_data']['theme'].astype(str).tolist(), [_baseline_theme(t.lower()) for t in texts])
+        self.assertEqual(kpis['theme_ratio'], expected.to_dict())
+
+
+class ParallelKeywordScanTest(unittest.TestCase):
+    """The process-pool scan must agree with the single-process one."""
+
+    def test_parallel_matches_single_process(self):
+        texts = pd.read_csv(DEMO_CSV)['Mention Text'].fillna('').astype(str).str.lower().tolist() * 3
+        expected = analysis._keyword_flags_chunk(texts)
+        out = io.StringIO()
+        with mock.patch.object(analysis, '_PARALLEL_MIN_MENTIONS', 1), \
+                mock.patch.object(analysis.os, 'cpu_count', return_value=3), \
+                contextlib.redirect_stdout(out):
+            flags = analysis._keyword_flags_all(texts)
+        self.assertNotIn('falling back', out.getvalue())  # the pool really ran
+        self.assertEqual(flags, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
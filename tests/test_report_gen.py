@@ -0,0 +1,31 @@
+import json
+import unittest
+
+import analysis
+import report_gen
+
+
+class WrapToWidthTest(unittest.TestCase):
+    def test_line_narrower_than_a_glyph_still_terminates(self):
+        self.assertEqual(report_gen._wrap_to_width('W', 'Helvetica', 10, 3), ('W',))
+        self.assertEqual(report_gen._wrap_to_width('WWW', 'Helvetica', 10, -5), ('W', 'W', 'W'))
+
+    def test_long_word_is_split_into_fitting_pieces(self):
+        lines = report_gen._wrap_to_width('x' * 2000, 'Helvetica', 10, 100)
+        self.assertEqual(''.join(lines), 'x' * 2000)
+        self.assertTrue(all(report_gen.stringWidth(line, 'Helvetica', 10) <= 100 for line in lines))
+
+
+class JsonSummaryTest(unittest.TestCase):
+    def test_json_summary_serializes_with_analyzed_dataframe(self):
+        mentions = [{'text': 'Zenith Bank posts profit', 'source': 'Guardian NG', 'date': '2025-03-11'}]
+        kpis = analysis.compute_kpis(mentions, [], 'Zenith Bank', ['GT Bank'])
+        _, pdf_bytes, summary = report_gen.generate_report(
+            kpis, [('profit', 1)], kpis['analyzed_data'], brand='Zenith Bank', competitors=['GT Bank'], include_json=True
+        )
+        self.assertTrue(pdf_bytes.startswith(b'%PDF'))
+        self.assertEqual(json.loads(json.dumps(summary))['kpis']['analyzed_data'][0]['mentioned_brands'], ['Zenith Bank'])
+
+
+if __name__ == '__main__':
+    unittest.main()